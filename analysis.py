@@ -0,0 +1,197 @@
+"""
+Vectorized cross-sectional analysis engine
+
+All cached closes are packed into one right-aligned (tickers x bars) matrix
+and the statistics from app.analyze() are computed for the whole universe
+with array operations. Tickers with shorter histories are processed in
+groups of equal length so every row sees exactly its own window.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Mapping
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import metrics
+
+STAGE_SECONDS = metrics.histogram('analysis_stage_seconds', 'Time spent in each analysis stage')
+
+SIGNALS = np.array(["STRONG BUY", "BUY", "MODERATE BUY", "WEAK BUY"], dtype=object)
+
+
+@dataclass
+class Packed:
+    tickers: List[str]
+    closes: np.ndarray   # (N, W) float64, NaN left-padded
+    dates: np.ndarray    # (N, W) datetime64[D], NaT left-padded
+    lengths: np.ndarray  # (N,) number of valid bars per row
+
+    def row(self, i: int):
+        """Valid closes and dates for row i"""
+        n = self.lengths[i]
+        w = self.closes.shape[1]
+        return self.closes[i, w - n:], self.dates[i, w - n:]
+
+
+@dataclass
+class Scan:
+    valid: np.ndarray
+    price: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    z: np.ndarray
+    rsi: np.ndarray
+    half_life: np.ndarray
+    prob: np.ndarray
+    days: np.ndarray
+    signal: np.ndarray
+
+
+def pack(cache: Mapping[str, pd.DataFrame], width: int = 100, min_bars: int = 50) -> Packed:
+    """Pack date/close frames into a right-aligned matrix"""
+    packed = getattr(cache, 'packed', None)
+    if packed is not None and packed.closes.shape[1] == width:
+        return packed
+    t0 = time.perf_counter()
+    tickers = [t for t, df in cache.items() if df is not None and len(df) >= min_bars]
+    n = len(tickers)
+    closes = np.full((n, width), np.nan)
+    dates = np.full((n, width), np.datetime64('NaT'), dtype='datetime64[D]')
+    lengths = np.zeros(n, dtype=np.int64)
+    for i, t in enumerate(tickers):
+        df = cache[t]
+        c = df['close'].values[-width:]
+        k = len(c)
+        closes[i, width - k:] = c
+        dates[i, width - k:] = df['date'].values[-width:].astype('datetime64[D]')
+        lengths[i] = k
+    STAGE_SECONDS.observe(time.perf_counter() - t0, engine="vector", stage="pack")
+    return Packed(tickers, closes, dates, lengths)
+
+
+def rsi_batch(p: np.ndarray, period: int = 14) -> np.ndarray:
+    """Wilder RSI of each row, matching app.rsi()"""
+    n_rows, n = p.shape
+    if n < period + 1:
+        return np.full(n_rows, 50.0)
+    d = np.diff(p, axis=1)
+    # The smoothing recursion unrolls into fixed weights over the window;
+    # gains and losses are the halves of |d| +/- d, so two dot products suffice
+    a, m = 1.0 / period, n - 1
+    w = a * (1 - a) ** np.arange(m - 1, -1, -1, dtype=np.float64)
+    w[0] = (1 - a) ** (m - 1)
+    net, tot = d @ w, np.abs(d) @ w
+    ag, al = (tot + net) / 2, (tot - net) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.clip(100 - 100 / (1 + ag / al), 5, 95)
+    flat = al < 0.0001
+    return np.where(flat, np.where(ag > 0, 95.0, 50.0), r)
+
+
+def half_life_batch(p: np.ndarray) -> np.ndarray:
+    """AR(1) mean reversion half-life of each row, matching app.half_life()"""
+    n_rows, n = p.shape
+    if n < 20:
+        return np.full(n_rows, 30.0)
+    y, x = np.diff(p, axis=1), p[:, :-1]
+    xc = x - x.mean(axis=1, keepdims=True)
+    yc = y - y.mean(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        b = np.einsum('ij,ij->i', xc, yc) / np.einsum('ij,ij->i', xc, xc)
+        hl = np.clip(-np.log(2) / b, 3, 60)
+    hl = np.where(b >= 0, 45.0, hl)
+    return np.where(np.isfinite(b), hl, 30.0)
+
+
+def prob_batch(z: np.ndarray, r: np.ndarray, hl: np.ndarray) -> np.ndarray:
+    """Reversion probability, matching prob_one()"""
+    zp = 0.4 + 0.8 * (stats.norm.cdf(np.abs(z)) - 0.5)
+    rp = np.select([r < 30, r < 40], [0.6 + 0.3 * (30 - r) / 30, 0.5 + 0.2 * (40 - r) / 10], 0.3)
+    hp = np.where(hl < 30, 0.7 + 0.2 * (30 - hl) / 30, 0.3 + 0.4 * np.maximum(0, 60 - hl) / 60)
+    ag = np.select([(z < -1.5) & (r < 35), (z < -1.0) & (r < 40)], [1.2, 1.1], 1.0)
+    return np.clip((zp * 0.35 + rp * 0.35 + hp * 0.30) * ag, 0.15, 0.95)
+
+
+def prob_one(z: float, r: float, hl: float) -> float:
+    """Scalar prob_batch() without numpy/scipy call overhead; app.prob() and the live book use it"""
+    zp = 0.4 + 0.8 * (0.5 * math.erf(abs(z) / math.sqrt(2)))
+    if r < 30:
+        rp = 0.6 + 0.3 * (30 - r) / 30
+    elif r < 40:
+        rp = 0.5 + 0.2 * (40 - r) / 10
+    else:
+        rp = 0.3
+    hp = 0.7 + 0.2 * (30 - hl) / 30 if hl < 30 else 0.3 + 0.4 * max(0, 60 - hl) / 60
+    if z < -1.5 and r < 35:
+        ag = 1.2
+    elif z < -1.0 and r < 40:
+        ag = 1.1
+    else:
+        ag = 1.0
+    return min(max((zp * 0.35 + rp * 0.35 + hp * 0.30) * ag, 0.15), 0.95)
+
+
+def signal_one(z: float, r: float) -> str:
+    """Signal label of one z/RSI pair; the scalar twin of signal_index()"""
+    az = abs(z)
+    if az > 2.0 and r < 30:
+        return SIGNALS[0]
+    if az > 1.8 and r < 40:
+        return SIGNALS[1]
+    if az > 1.5 and r < 45:
+        return SIGNALS[2]
+    return SIGNALS[3]
+
+
+def signal_index(z: np.ndarray, r: np.ndarray) -> np.ndarray:
+    """Position of each row's label in SIGNALS"""
+    az = np.abs(z)
+    return np.select([(az > 2.0) & (r < 30), (az > 1.8) & (r < 40), (az > 1.5) & (r < 45)], [0, 1, 2], 3)
+
+
+def signal_batch(z: np.ndarray, r: np.ndarray) -> np.ndarray:
+    """Signal labels, matching signal_one()"""
+    return SIGNALS[signal_index(z, r)]
+
+
+def scan(packed: Packed) -> Scan:
+    """Compute analyze() statistics for every packed row"""
+    n = len(packed.tickers)
+    price, mean, std, r, hl = (np.full(n, np.nan) for _ in range(5))
+    width = packed.closes.shape[1]
+    spent = {"stats": 0.0, "rsi": 0.0, "half_life": 0.0}
+    for k in np.unique(packed.lengths):
+        rows = np.flatnonzero(packed.lengths == k)
+        p = packed.closes[rows, width - k:]
+        t0 = time.perf_counter()
+        price[rows], mean[rows], std[rows] = p[:, -1], p.mean(axis=1), p.std(axis=1)
+        t1 = time.perf_counter()
+        r[rows] = rsi_batch(p)
+        t2 = time.perf_counter()
+        hl[rows] = half_life_batch(p)
+        t3 = time.perf_counter()
+        spent["stats"] += t1 - t0
+        spent["rsi"] += t2 - t1
+        spent["half_life"] += t3 - t2
+    t0 = time.perf_counter()
+    valid = std >= 0.01
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(valid, (price - mean) / std, np.nan)
+    pr = prob_batch(z, r, hl)
+    days = np.clip(hl * (1 + 0.5 * np.abs(z)), 3, 45)
+    res = Scan(valid, price, mean, std, z, r, hl, pr, days, signal_batch(z, r))
+    spent["prob"] = time.perf_counter() - t0
+    for stage, sec in spent.items():
+        STAGE_SECONDS.observe(sec, engine="vector", stage=stage)
+    return res
+
+
+def rank(s: Scan, z_max: float = -1.0) -> np.ndarray:
+    """Indices of candidates with rounded z <= z_max, best rounded prob first"""
+    cand = np.flatnonzero(s.valid & (s.z < 0) & (np.round(s.z, 2) <= z_max))
+    order = np.argsort(-np.round(s.prob[cand], 3), kind='stable')
+    return cand[order]
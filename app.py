@@ -5,22 +5,67 @@ Uses Yahoo Finance for 1 year of historical data
 """
 
 import numpy as np
-from scipy import stats
 import pandas as pd
-from datetime import datetime, timedelta
-from dataclasses import dataclass
-from typing import List, Dict
-import logging, threading, os
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+import logging, threading, os, json, math, uuid, time, zlib
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from flask import Flask, jsonify
+from flask import Flask, Response, g, jsonify, request
+
+import fetcher
+from fetcher import FakeProvider, YahooProvider, fetch_universe, normalize
+from store import PriceStore
+from shared import SharedState
+from streaming import LiveBook
+import analysis
+import correlation
+import formats
+import metrics
 
 app = Flask(__name__)
 
+FETCH_BATCH_SIZE = int(os.environ.get('FETCH_BATCH_SIZE', 50))
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 4))
+FETCH_DAYS = int(os.environ.get('FETCH_DAYS', 365))  # history requested for tickers not yet stored
+PRICE_STORE = os.environ.get('PRICE_STORE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+SHARED_DIR = os.environ.get('SHARED_DIR', os.path.join(PRICE_STORE, 'shared'))
+DEDUPE_CORR = float(os.environ.get('DEDUPE_CORR', 0.9))  # max return correlation between listed names
+
+price_store = PriceStore(PRICE_STORE)
+shared_state = SharedState(SHARED_DIR)
 stock_data_cache: Dict[str, pd.DataFrame] = {}
 fetch_status = {"in_progress": False, "completed": 0, "failed": 0, "total": 0, "message": "", "last_fetch": None}
+status_lock = threading.Lock()
+status_changed = threading.Condition()
+PARTIAL_TOP = 10
+
+# Bumped whenever stock_data_cache is replaced; cache_tag keys memoized
+# analysis results and is shared by all workers mapping the same snapshot
+cache_generation = 0
+cache_tag = ""
+cache_modified: Optional[datetime] = None
+_synced_mtime = None
+BOOT_ID = uuid.uuid4().hex[:8]
+
+# Set PROFILE_TOKEN to allow per-request sampling via X-Profile: <token> or ?_profile=<token>
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.001))
+
+FETCH_TICKER_SECONDS = fetcher.TICKER_SECONDS
+FETCH_FAILURES = fetcher.FAILURES
+STAGE_SECONDS = analysis.STAGE_SECONDS
+REQUEST_SECONDS = metrics.histogram('http_request_seconds', 'Request handling time by endpoint')
+REQUEST_STAGE_SECONDS = metrics.histogram('http_request_stage_seconds', 'Time per request handling stage')
+REQUESTS = metrics.counter('http_requests_total', 'Requests by endpoint and status')
+MEMO_BUILDS = metrics.counter('analysis_memo_builds_total', 'Full analysis table computations')
+metrics.gauge('cache_tickers', 'Tickers in the analysis cache', lambda: len(stock_data_cache))
+metrics.gauge('cache_generation', 'Generation of the analysis cache', lambda: cache_generation)
+metrics.gauge('cache_age_seconds', 'Seconds since the analysis cache was replaced',
+              lambda: (datetime.now(timezone.utc) - cache_modified).total_seconds() if cache_modified else None)
 
 SP500 = ["A","AAPL","ABBV","ABNB","ABT","ACGL","ACN","ADBE","ADI","ADM","ADP","ADSK","AEE","AEP","AES","AFL","AIG","AIZ","AJG","AKAM","ALB","ALGN","ALL","ALLE","AMAT","AMCR","AMD","AME","AMGN","AMP","AMT","AMZN","ANET","ANSS","AON","AOS","APA","APD","APH","APTV","ARE","ATO","AVB","AVGO","AVY","AWK","AXON","AXP","AZO","BA","BAC","BALL","BAX","BBWI","BBY","BDX","BEN","BG","BIIB","BIO","BK","BKNG","BKR","BLDR","BLK","BMY","BR","BRK-B","BRO","BSX","BWA","BX","BXP","C","CAG","CAH","CARR","CAT","CB","CBOE","CBRE","CCI","CCL","CDNS","CDW","CE","CEG","CF","CFG","CHD","CHRW","CHTR","CI","CINF","CL","CLX","CMA","CMCSA","CME","CMG","CMI","CMS","CNC","CNP","COF","COO","COP","COR","COST","CPAY","CPB","CPRT","CPT","CRL","CRM","CSCO","CSGP","CSX","CTAS","CTLT","CTRA","CTSH","CTVA","CVS","CVX","D","DAL","DAY","DD","DE","DECK","DFS","DG","DGX","DHI","DHR","DIS","DLR","DLTR","DOC","DOV","DOW","DPZ","DRI","DTE","DUK","DVA","DVN","DXCM","EA","EBAY","ECL","ED","EFX","EG","EIX","EL","ELV","EMN","EMR","ENPH","EOG","EPAM","EQIX","EQR","EQT","ES","ESS","ETN","ETR","ETSY","EVRG","EW","EXC","EXPD","EXPE","EXR","F","FANG","FAST","FCX","FDS","FDX","FE","FFIV","FI","FICO","FIS","FITB","FLT","FMC","FOX","FOXA","FRT","FSLR","FTNT","FTV","GD","GDDY","GE","GEHC","GEN","GEV","GILD","GIS","GL","GLW","GM","GNRC","GOOG","GOOGL","GPC","GPN","GRMN","GS","GWW","HAL","HAS","HBAN","HCA","HD","HES","HIG","HII","HLT","HOLX","HON","HPE","HPQ","HRL","HSIC","HST","HSY","HUBB","HUM","HWM","IBM","ICE","IDXX","IEX","IFF","ILMN","INCY","INTC","INTU","INVH","IP","IPG","IQV","IR","IRM","ISRG","IT","ITW","J","JBHT","JBL","JCI","JKHY","JNJ","JNPR","JPM","K","KDP","KEY","KEYS","KHC","KIM","KKR","KLAC","KMB","KMI","KMX","KO","KR","KVUE","L","LDOS","LEN","LH","LHX","LIN","LKQ","LLY","LMT","LNT","LOW","LRCX","LULU","LUV","LVS","LW","LYB","LYV","MA","MAA","MAR","MAS","MCD","MCHP","MCK","MCO","MDLZ","MDT","MET","META","MGM","MHK","MKC","MKTX","MLM","MMC","MMM","MNST","MO","MOH","MOS","MPC","MPWR","MRK","MRNA","MRO","MS","MSCI","MSFT","MSI","MTB","MTCH","MTD","MU","NCLH","NDAQ","NDSN","NEE","NEM","NFLX","NI","NKE","NOC","NOW","NRG","NSC","NTAP","NTRS","NUE","NVDA","NVR","NWS","NWSA","O","ODFL","OKE","OMC","ON","ORCL","ORLY","OTIS","OXY","PANW","PARA","PAYC","PAYX","PCAR","PCG","PEG","PEP","PFE","PFG","PG","PGR","PH","PHM","PKG","PLD","PM","PNC","PNR","PNW","PODD","POOL","PPG","PPL","PRU","PSA","PSX","PTC","PWR","PXD","QCOM","QRVO","RCL","REG","REGN","RF","RJF","RL","RMD","ROK","ROL","ROP","ROST","RSG","RTX","SBAC","SBUX","SCHW","SHW","SJM","SLB","SMCI","SNA","SNPS","SO","SOLV","SPG","SPGI","SRE","STE","STLD","STT","STX","STZ","SWK","SWKS","SYF","SYK","SYY","T","TAP","TDG","TDY","TECH","TEL","TER","TFC","TFX","TGT","TJX","TMO","TMUS","TPR","TRGP","TRMB","TROW","TRV","TSCO","TSLA","TSN","TT","TTWO","TXN","TXT","TYL","UAL","UBER","UDR","UHS","ULTA","UNH","UNP","UPS","URI","USB","V","VICI","VLO","VLTO","VMC","VRSK","VRSN","VRTX","VST","VTR","VTRS","VZ","WAB","WAT","WBA","WBD","WDC","WEC","WELL","WFC","WM","WMB","WMT","WRB","WST","WTW","WY","WYNN","XEL","XOM","XYL","YUM","ZBH","ZBRA","ZTS"]
 
@@ -41,75 +86,239 @@ class Stock:
     prob: float
     days: float
     signal: str
-    prices: List[float]
-    dates: List[str]
-    gap_hist: List[float]
+    prices: Optional[List[float]] = None
+    dates: Optional[List[str]] = None
+    gap_hist: Optional[List[float]] = None
 
 
 def fetch_data(ticker: str, days: int = 365) -> pd.DataFrame:
-    """Fetch historical data from Yahoo Finance (1 year)"""
+    """Fetch historical data from Yahoo Finance (1 year).
+
+    Legacy serial path, one blocking request per call. fetch_all() goes
+    through fetcher.fetch_universe(); this is kept as the serial baseline
+    for bench/run.py.
+    """
     try:
         import yfinance as yf
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
         stock = yf.Ticker(ticker)
-        df = stock.history(start=start_date.strftime('%Y-%m-%d'), 
-                          end=end_date.strftime('%Y-%m-%d'),
-                          raise_errors=False)
+        t0 = time.perf_counter()
+        df = normalize(stock.history(start=start_date.strftime('%Y-%m-%d'), 
+                                     end=end_date.strftime('%Y-%m-%d'),
+                                     raise_errors=False))
+        FETCH_TICKER_SECONDS.observe(time.perf_counter() - t0)
         
-        if df is None or df.empty or len(df) < 50:
+        if df is None:
+            FETCH_FAILURES.inc(reason="empty")
+            return None
+        if len(df) < 50:
+            FETCH_FAILURES.inc(reason="short_history")
             return None
         
-        df = df.reset_index()
-        df.columns = [c.lower() for c in df.columns]
-        
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
-            if df['date'].dt.tz is not None:
-                df['date'] = df['date'].dt.tz_localize(None)
-        
-        return df[['date', 'close']].tail(100)
+        return df.tail(100)
     except Exception as e:
+        FETCH_FAILURES.inc(reason=type(e).__name__)
         logger.debug(f"Error fetching {ticker}: {e}")
         return None
 
 
-def fetch_all():
-    """Background thread to fetch all S&P 500 stocks"""
-    global stock_data_cache, fetch_status
-    import time
-    
-    fetch_status = {
-        "in_progress": True,
-        "completed": 0,
-        "failed": 0,
-        "total": len(SP500),
-        "message": "Starting...",
-        "last_fetch": None
-    }
+def make_provider():
+    """Price provider selected by PRICE_PROVIDER (yahoo or fake)"""
+    if os.environ.get('PRICE_PROVIDER', 'yahoo').lower() == 'fake':
+        return FakeProvider(latency=float(os.environ.get('FAKE_LATENCY', 0.2)),
+                            fail_rate=float(os.environ.get('FAKE_FAIL_RATE', 0.0)))
+    return YahooProvider()
+
+
+def fetch_all(provider=None, backfill_days: Optional[int] = None):
+    """Background thread to refresh all S&P 500 stocks from the last stored bar.
+
+    backfill_days re-requests that much history for every ticker instead,
+    e.g. to extend the store for multi-year backtests.
+    """
+    reset_status()
     
     cache = {}
+    today = pd.Timestamp(datetime.now().date())
+    # Re-request the last stored bar too, in case it was captured intraday
+    if backfill_days:
+        since = dict.fromkeys(SP500)
+    else:
+        since = {t: price_store.last_date(t) for t in SP500}
+    stale = [t for t in SP500 if since[t] is None or since[t] < today]
+    last_publish = [0.0]
     
-    for i, t in enumerate(SP500):
-        fetch_status["message"] = f"Fetching {t}... ({i+1}/{len(SP500)})"
-        
-        df = fetch_data(t)
-        
-        if df is not None and len(df) >= 50:
-            cache[t] = df
-            fetch_status["completed"] += 1
-        else:
-            fetch_status["failed"] += 1
-        
-        # Rate limiting
-        if (i + 1) % 10 == 0:
-            time.sleep(0.5)
+    def on_result(t, df, reason=None):
+        try:
+            full = price_store.append(t, df) if df is not None else price_store.load(t)
+        except Exception as e:
+            logger.warning(f"Store write failed for {t}: {e}")
+            full = df
+        a = None
+        if full is not None and len(full) >= 50:
+            cache[t] = full.tail(100).reset_index(drop=True)
+            a = analyze(t, cache[t], series=False)
+        with status_lock:
+            if t in cache:
+                fetch_status["completed"] += 1
+            else:
+                # Counted only here, once the store fallback has also come up short
+                fetch_status["failed"] += 1
+                FETCH_FAILURES.inc(reason="short_history" if full is not None else reason or "empty")
+            if a and a.z <= -1.0:
+                # Running top-N of the tickers analyzed so far, for /api/stream
+                partial = fetch_status["partial"] + [result_row(a, series=False)]
+                partial.sort(key=lambda r: r["reversion_probability"], reverse=True)
+                fetch_status["partial"] = partial[:PARTIAL_TOP]
+                fetch_status["candidates"] += 1
+            done = fetch_status["completed"] + fetch_status["failed"]
+            fetch_status["message"] = f"Fetched {t}... ({done}/{len(SP500)})"
+        if time.monotonic() - last_publish[0] > 0.25:
+            last_publish[0] = time.monotonic()
+            publish_status()
+    
+    for t in SP500:
+        if t not in stale:
+            on_result(t, None)
     
-    stock_data_cache = cache
-    fetch_status["in_progress"] = False
-    fetch_status["last_fetch"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    fetch_status["message"] = f"Done: {fetch_status['completed']} loaded"
+    try:
+        fetch_universe(stale, provider or make_provider(), batch_size=FETCH_BATCH_SIZE,
+                       workers=FETCH_WORKERS, on_result=on_result, since=since,
+                       days=backfill_days or FETCH_DAYS)
+    except Exception as e:
+        logger.exception("Fetch failed")
+        with status_lock:
+            fetch_status["message"] = f"Fetch failed: {e}"
+    
+    if cache:
+        # Batches finish in any order; pack in universe order so rows stay stable across fetches
+        set_cache({t: cache[t] for t in SP500 if t in cache})
+    with status_lock:
+        fetch_status["in_progress"] = False
+        fetch_status["last_fetch"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if not fetch_status["message"].startswith("Fetch failed"):
+            fetch_status["message"] = f"Done: {fetch_status['completed']} loaded"
+    publish_status()
+
+
+def reset_status():
+    """Mark a fetch as started, before its thread begins, so streams see it"""
+    global fetch_status
+    with status_lock:
+        fetch_status = {
+            "in_progress": True,
+            "completed": 0,
+            "failed": 0,
+            "total": len(SP500),
+            "message": "Starting...",
+            "last_fetch": None,
+            "candidates": 0,
+            "partial": []
+        }
+    publish_status()
+
+
+def publish_status():
+    """Share this process's fetch_status with the other workers"""
+    with status_lock:
+        status = dict(fetch_status)
+    try:
+        shared_state.write_status(status)
+    except OSError as e:
+        logger.warning(f"Could not publish status: {e}")
+    with status_changed:
+        status_changed.notify_all()
+
+
+def current_status() -> dict:
+    """Fetch status as seen by any worker on this host"""
+    with status_lock:
+        if fetch_status["in_progress"]:
+            return dict(fetch_status)
+    shared = shared_state.read_status()
+    if shared is None:
+        with status_lock:
+            return dict(fetch_status)
+    shared = dict(shared)
+    # A fetcher that died mid-run leaves in_progress set but releases the lock
+    if shared["in_progress"] and not shared_state.fetch_lock().held():
+        shared["in_progress"] = False
+    return shared
+
+
+def adopt(cache, generation, tag, modified):
+    """Make cache the current analysis cache; modified is a UTC-aware datetime"""
+    global stock_data_cache, cache_generation, cache_tag, cache_modified
+    with status_lock:
+        stock_data_cache = cache
+        cache_generation, cache_tag, cache_modified = generation, tag, modified
+
+
+def set_cache(cache):
+    """Publish cache as a shared snapshot and switch to it"""
+    global _synced_mtime
+    try:
+        snap = shared_state.publish(analysis.pack(cache))
+    except OSError as e:
+        logger.warning(f"Could not publish snapshot, keeping cache local: {e}")
+        gen = cache_generation + 1
+        adopt(cache, gen, f"{BOOT_ID}-{gen}", datetime.now(timezone.utc))
+        return
+    _synced_mtime = shared_state.current_mtime()
+    adopt(snap, snap.generation, snap.tag, snap.modified)
+
+
+def sync_cache():
+    """Switch to the newest shared snapshot if another worker published one"""
+    global _synced_mtime
+    mtime = shared_state.current_mtime()
+    if mtime is None or mtime == _synced_mtime:
+        return
+    snap = shared_state.load()
+    _synced_mtime = mtime
+    if snap is not None and snap.tag != cache_tag:
+        adopt(snap, snap.generation, snap.tag, snap.modified)
+
+
+def warm_cache():
+    """Map the shared snapshot, or build one from the on-disk store, at startup"""
+    sync_cache()
+    if stock_data_cache:
+        logger.info(f"Mapped snapshot {cache_tag} with {len(stock_data_cache)} tickers")
+        return
+    lock = shared_state.fetch_lock()
+    owner = lock.acquire()
+    try:
+        cache = price_store.warm(SP500)
+        if not cache:
+            return
+        if owner:
+            set_cache(cache)
+        else:
+            adopt(cache, 0, f"{BOOT_ID}-0", datetime.now(timezone.utc))
+    finally:
+        if owner:
+            lock.release()
+    with status_lock:
+        fetch_status["message"] = f"Loaded {len(cache)} from store"
+    logger.info(f"Warmed cache with {len(cache)} tickers from {PRICE_STORE}")
+
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def startup():
+    """Warm this worker's cache once; runs before app.run() or on the first request"""
+    global _started
+    if _started:
+        return
+    with _start_lock:
+        if not _started:
+            warm_cache()
+            _started = True
 
 
 def rsi(prices, p=14):
@@ -144,35 +353,16 @@ def half_life(prices):
 
 def prob(z, r, hl):
     """Calculate reversion probability"""
-    zp = stats.norm.cdf(abs(z)) - 0.5
-    zp = 0.4 + 0.4 * (2 * zp)
-    
-    if r < 30:
-        rp = 0.6 + 0.3 * (30 - r) / 30
-    elif r < 40:
-        rp = 0.5 + 0.2 * (40 - r) / 10
-    else:
-        rp = 0.3
-    
-    hp = 0.7 + 0.2 * (30 - hl) / 30 if hl < 30 else 0.3 + 0.4 * max(0, (60 - hl)) / 60
-    
-    if z < -1.5 and r < 35:
-        ag = 1.2
-    elif z < -1.0 and r < 40:
-        ag = 1.1
-    else:
-        ag = 1.0
-    
-    return min(max((zp * 0.35 + rp * 0.35 + hp * 0.30) * ag, 0.15), 0.95)
+    return analysis.prob_one(z, r, hl)
 
 
-def analyze(t, df):
-    """Analyze a single stock - OVERSOLD ONLY"""
+def analyze(t, df, series=True):
+    """Analyze a single stock - OVERSOLD ONLY (series=False skips chart lists)"""
     if df is None or len(df) < 50:
         return None
     
+    t0 = time.perf_counter()
     p = df['close'].values
-    d = df['date'].dt.strftime('%Y-%m-%d').tolist()
     
     cur, m, s = p[-1], np.mean(p), np.std(p)
     
@@ -187,24 +377,20 @@ def analyze(t, df):
     
     gap = cur - m
     gap_pct = (gap / m) * 100
-    gh = [(x - m) for x in p]
     
-    r, hl = rsi(p), half_life(p)
+    t1 = time.perf_counter()
+    r = rsi(p)
+    t2 = time.perf_counter()
+    hl = half_life(p)
+    t3 = time.perf_counter()
     pr = prob(z, r, hl)
     
     days = min(max(hl * (1 + 0.5 * abs(z)), 3), 45)
     
-    az = abs(z)
-    if az > 2.0 and r < 30:
-        sig = "STRONG BUY"
-    elif az > 1.8 and r < 40:
-        sig = "BUY"
-    elif az > 1.5 and r < 45:
-        sig = "MODERATE BUY"
-    else:
-        sig = "WEAK BUY"
+    sig = analysis.signal_one(z, r)
     
-    return Stock(
+    t4 = time.perf_counter()
+    st = Stock(
         ticker=t,
         name=NAMES.get(t, t),
         price=round(cur, 2),
@@ -217,73 +403,476 @@ def analyze(t, df):
         half_life=round(hl, 1),
         prob=round(pr, 3),
         days=round(days, 1),
-        signal=sig,
-        prices=[round(x, 2) for x in p],
-        dates=d,
-        gap_hist=[round(x, 2) for x in gh]
+        signal=sig
     )
+    if series:
+        st.prices = [round(x, 2) for x in p]
+        st.dates = df['date'].dt.strftime('%Y-%m-%d').tolist()
+        st.gap_hist = [round(x - m, 2) for x in p]
+    t5 = time.perf_counter()
+    for stage, sec in (("stats", t1 - t0), ("rsi", t2 - t1), ("half_life", t3 - t2),
+                       ("prob", t4 - t3), ("series", t5 - t4)):
+        STAGE_SECONDS.observe(sec, engine="scalar", stage=stage)
+    return st
+
+
+def stock_from_scan(packed, s, i, series=True):
+    """Build the analyze() result for row i of a vectorized scan"""
+    p, d = packed.row(i)
+    m = s.mean[i]
+    st = Stock(
+        ticker=packed.tickers[i],
+        name=NAMES.get(packed.tickers[i], packed.tickers[i]),
+        price=round(float(s.price[i]), 2),
+        mean=round(float(m), 2),
+        std=round(float(s.std[i]), 2),
+        z=round(float(s.z[i]), 2),
+        gap=round(float(s.price[i] - m), 2),
+        gap_pct=round(float((s.price[i] - m) / m * 100), 2),
+        rsi=round(float(s.rsi[i]), 1),
+        half_life=round(float(s.half_life[i]), 1),
+        prob=round(float(s.prob[i]), 3),
+        days=round(float(s.days[i]), 1),
+        signal=s.signal[i]
+    )
+    if series:
+        st.prices = [round(x, 2) for x in p.tolist()]
+        st.dates = np.datetime_as_string(d, unit='D').tolist()
+        st.gap_hist = [round(x - m, 2) for x in p.tolist()]
+    return st
+
+
+def result_row(r: Stock, series: bool = True) -> dict:
+    """JSON shape of one /api/analyze result (series fields only if built)"""
+    row = {
+        "ticker": r.ticker,
+        "company_name": r.name,
+        "current_price": r.price,
+        "mean_price": r.mean,
+        "std_dev": r.std,
+        "z_score": r.z,
+        "gap_from_mean": r.gap,
+        "gap_percentage": r.gap_pct,
+        "rsi": r.rsi,
+        "half_life": r.half_life,
+        "reversion_probability": r.prob,
+        "expected_days": r.days,
+        "signal_strength": r.signal
+    }
+    if series and r.prices is not None:
+        row.update(prices=r.prices, dates=r.dates, gap_history=r.gap_hist)
+    return row
+
+
+@dataclass
+class AnalysisMemo:
+    """Ranked analysis of one cache generation, shared by all requests"""
+    generation: int
+    tag: str
+    modified: datetime
+    total: int
+    packed: analysis.Packed
+    scan: analysis.Scan
+    ranked: np.ndarray
+    rows: List[dict]
+    corr: Optional[correlation.Correlation]
+    default: List[int] = field(default_factory=list)
+    found: int = 0
+    encoded: Dict[tuple, bytes] = field(default_factory=dict)
+    series: Dict[int, dict] = field(default_factory=dict)
+    peer_z: Dict[int, Optional[float]] = field(default_factory=dict)
+    index: Dict[str, int] = field(default_factory=dict)
+
+    def full_row(self, k: int) -> dict:
+        """Summary row k with its chart series, built once per generation"""
+        i = int(self.ranked[k])
+        if i not in self.series:
+            st = stock_from_scan(self.packed, self.scan, i)
+            self.series[i] = {"prices": st.prices, "dates": st.dates, "gap_history": st.gap_hist}
+        return {**self.row(k), **self.series[i]}
+
+    def row(self, k: int) -> dict:
+        return {**self.rows[k], "peer_z": self.peer_z.get(k)}
+
+    def score_peers(self, picked: List[int]):
+        """Peer-relative z for the picked rows, computed only for rows that are served"""
+        todo = [k for k in picked if k not in self.peer_z]
+        if not todo or self.corr is None:
+            return
+        z = self.corr.residual_z(self.ranked[todo])
+        for k, pz in zip(todo, z):
+            self.peer_z[k] = None if np.isnan(pz) else round(float(pz), 2)
+
+    def pick(self, keep: List[int], top: int, max_corr: float) -> List[int]:
+        """First top of keep, skipping names too correlated with one already listed"""
+        if self.corr is None:
+            return keep[:top]
+        rows = self.corr.distinct([int(self.ranked[k]) for k in keep], top, max_corr)
+        pos = {int(self.ranked[k]): k for k in keep}
+        return [pos[i] for i in rows]
+
+    def payload(self, picked: List[int], found: int) -> dict:
+        self.score_peers(picked)
+        return {
+            "results": [self.full_row(k) for k in picked],
+            "total_analyzed": self.total,
+            "candidates_found": found
+        }
+
+    def compact(self, picked: List[int], found: int) -> dict:
+        """Summary table as columns, without chart series"""
+        self.score_peers(picked)
+        return {
+            "columns": formats.columns([self.row(k) for k in picked]),
+            "total_analyzed": self.total,
+            "candidates_found": found
+        }
+
+    def chart_series(self, tickers: List[str]) -> dict:
+        """Closes and gaps of tickers aligned on one shared date axis (NaN where missing)"""
+        if not self.index:
+            self.index = {t: i for i, t in enumerate(self.packed.tickers)}
+        idx = [(t, self.index[t]) for t in tickers if t in self.index]
+        rows = [self.packed.row(i) for _, i in idx]
+        if not rows:
+            return {"dates": [], "series": {}}
+        axis = np.unique(np.concatenate([d for _, d in rows]))
+        series = {}
+        for (t, i), (p, d) in zip(idx, rows):
+            full = np.full(len(axis), np.nan)
+            full[np.searchsorted(axis, d)] = p
+            series[t] = {"prices": full, "gap_history": full - self.scan.mean[i]}
+        return {"dates": np.datetime_as_string(axis, unit='D').tolist(), "series": series}
+
+
+_memo: Optional[AnalysisMemo] = None
+_corr: Optional[correlation.Correlation] = None  # rolled forward across generations; None if unavailable
+_memo_lock = threading.Lock()
+
+
+def analysis_memo() -> Optional[AnalysisMemo]:
+    """Analysis of the current cache generation, computed at most once"""
+    global _memo, _corr
+    sync_cache()
+    with status_lock:
+        cache, gen, tag, modified = stock_data_cache, cache_generation, cache_tag, cache_modified
+    if not cache:
+        return None
+    memo = _memo
+    if memo is not None and memo.tag == tag:
+        return memo
+    with _memo_lock:
+        if _memo is not None and _memo.tag == tag:
+            return _memo
+        packed = analysis.pack(cache)
+        s = analysis.scan(packed)
+        t0 = time.perf_counter()
+        ranked = analysis.rank(s, z_max=0.0)
+        rows = [result_row(stock_from_scan(packed, s, i, series=False)) for i in ranked]
+        STAGE_SECONDS.observe(time.perf_counter() - t0, engine="vector", stage="rank")
+        _corr = correlation.update(_corr, packed)
+        memo = AnalysisMemo(gen, tag, modified or datetime.now(timezone.utc), len(cache), packed, s, ranked,
+                            rows, _corr)
+        default = [k for k, r in enumerate(rows) if r["z_score"] <= -1.0]
+        memo.default, memo.found = memo.pick(default, 10, DEDUPE_CORR), len(default)
+        MEMO_BUILDS.inc()
+        _memo = memo
+        return memo
+
+
+_live: Optional[LiveBook] = None
+_live_tag = None
+_live_lock = threading.Lock()
+
+
+def live_book() -> Optional[LiveBook]:
+    """Streaming indicator book seeded from the current cache generation (hold _live_lock)"""
+    global _live, _live_tag
+    memo = analysis_memo()
+    if memo is None:
+        return None
+    if _live_tag != memo.tag:
+        _live, _live_tag = LiveBook.from_packed(memo.packed), memo.tag
+    return _live
+
+
+def live_row(t: str, m: dict) -> dict:
+    return result_row(Stock(
+        ticker=t, name=NAMES.get(t, t), price=round(m["price"], 2), mean=round(m["mean"], 2),
+        std=round(m["std"], 2), z=round(m["z"], 2), gap=round(m["price"] - m["mean"], 2),
+        gap_pct=round((m["price"] - m["mean"]) / m["mean"] * 100, 2), rsi=round(m["rsi"], 1),
+        half_life=round(m["half_life"], 1), prob=round(m["prob"], 3), days=round(m["days"], 1),
+        signal=m["signal"]))
+
+
+@app.route('/api/ticks', methods=['POST'])
+def api_ticks():
+    """Apply live prices: {"ticks": {ticker: price}, "new_bar": false}.
+
+    Ticks update this worker's book only; a new fetch generation resets it.
+    """
+    body = request.get_json(silent=True) or {}
+    ticks = body.get("ticks")
+    if not isinstance(ticks, dict):
+        return jsonify({"error": "Expected {\"ticks\": {ticker: price}}"}), 400
+    try:
+        ticks = {str(t): float(p) for t, p in ticks.items()}
+    except (TypeError, ValueError):
+        return jsonify({"error": "Prices must be numbers"}), 400
+    bad = sorted(t for t, p in ticks.items() if not (math.isfinite(p) and p > 0))
+    if bad:
+        return jsonify({"error": "Prices must be finite and positive", "invalid": bad}), 400
+    with _live_lock:
+        book = live_book()
+        if book is None:
+            return jsonify({"error": "No data"})
+        unknown = book.ingest(ticks, new_bar=bool(body.get("new_bar")))
+    return jsonify({"updated": len(ticks) - len(unknown), "unknown": unknown})
+
+
+@app.route('/api/live')
+def api_live():
+    top = max(0, request.args.get("top", 10, type=int))
+    with _live_lock:
+        book = live_book()
+        if book is None:
+            return jsonify({"error": "No data", "results": []})
+        ranked = book.top(top)
+        found = len(book.latest)
+    return jsonify({"results": [live_row(t, m) for t, m in ranked], "candidates_found": found})
 
 
 @app.route('/api/fetch', methods=['POST'])
 def api_fetch():
-    if fetch_status["in_progress"]:
+    """Start a refresh; ?backfill_days=N re-downloads N days for every ticker"""
+    backfill = request.args.get("backfill_days", type=int)
+    if backfill is not None and backfill <= 0:
+        return jsonify({"error": "backfill_days must be positive"}), 400
+    lock = shared_state.fetch_lock()
+    if not lock.acquire():
         return jsonify({"error": "Already fetching"})
-    t = threading.Thread(target=fetch_all)
+    reset_status()
+    
+    def run():
+        try:
+            fetch_all(backfill_days=backfill)
+        finally:
+            lock.release()
+    
+    t = threading.Thread(target=run)
     t.daemon = True
     t.start()
     return jsonify({"status": "started"})
 
 
+def status_payload(st: dict) -> dict:
+    return {
+        "stocks_loaded": len(stock_data_cache),
+        "in_progress": st["in_progress"],
+        "completed": st["completed"],
+        "failed": st["failed"],
+        "total": st["total"],
+        "message": st["message"],
+        "last_fetch": st["last_fetch"]
+    }
+
+
 @app.route('/api/status')
 def api_status():
-    return jsonify({
-        "stocks_loaded": len(stock_data_cache),
-        "in_progress": fetch_status["in_progress"],
-        "completed": fetch_status["completed"],
-        "failed": fetch_status["failed"],
-        "total": fetch_status["total"],
-        "message": fetch_status["message"],
-        "last_fetch": fetch_status["last_fetch"]
-    })
+    sync_cache()
+    return jsonify(status_payload(current_status()))
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events: fetch progress, running top-N oversold, then done.
+
+    Each open stream holds a worker thread for the length of the fetch, so
+    run gunicorn with threaded or async workers when serving many clients.
+    """
+    def events():
+        # No partial event until there is a candidate, so the page keeps its cards meanwhile
+        last_progress, last_partial, last_beat = None, [], time.monotonic()
+        while True:
+            sync_cache()
+            st = current_status()
+            payload = status_payload(st)
+            if not st["in_progress"]:
+                yield sse("done", payload)
+                return
+            progress = (st["completed"], st["failed"], st["message"])
+            if progress != last_progress:
+                last_progress = progress
+                yield sse("progress", payload)
+            partial = st.get("partial") or []
+            if partial != last_partial:
+                last_partial = partial
+                yield sse("partial", {"results": partial, "candidates_found": st.get("candidates", 0),
+                                      "total_analyzed": st["completed"]})
+            if time.monotonic() - last_beat > 15:
+                last_beat = time.monotonic()
+                yield ": keep-alive\n\n"
+            with status_changed:
+                status_changed.wait(timeout=0.5)
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+FORMATS = {"json": formats.JSON, "compact": formats.JSON, "msgpack": formats.MSGPACK, "arrow": formats.ARROW}
+FILTERS = ("top", "z_max", "min_prob", "signal", "max_corr")
+
+
+def negotiate(allowed=("json", "compact", "msgpack", "arrow")) -> Optional[str]:
+    """Response format from ?format= or the Accept header; None if unsupported"""
+    fmt = request.args.get("format")
+    if fmt:
+        ok = fmt in allowed and FORMATS.get(fmt) in formats.available()
+        return fmt if ok else None
+    offered = [FORMATS[f] for f in allowed if f in ("json", "msgpack", "arrow")]
+    best = request.accept_mimetypes.best_match([m for m in offered if m in formats.available()],
+                                               default=formats.JSON)
+    return {formats.MSGPACK: "msgpack", formats.ARROW: "arrow"}.get(best, "json")
+
+
+def variant_etag(tag: str, fmt: str, gz: bool) -> str:
+    """ETag of one encoding of a response; plain JSON keeps the bare tag"""
+    return tag if fmt == "json" and not gz else f"{tag}-{fmt}{'-gz' if gz else ''}"
+
+
+def not_modified(tag: str, fmt: str, gz: bool) -> bool:
+    """True if the client already holds this variant, so the body need not be built"""
+    return request.if_none_match.contains_weak(variant_etag(tag, fmt, gz))
+
+
+def encoded_response(body: bytes, fmt: str, tag: str, gz: bool, modified: datetime):
+    resp = app.response_class(body, mimetype=FORMATS[fmt])
+    if gz:
+        resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.update(("Accept", "Accept-Encoding"))
+    resp.set_etag(variant_etag(tag, fmt, gz))
+    resp.last_modified = modified
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
 
 
 @app.route('/api/analyze')
 def api_analyze():
-    if not stock_data_cache:
+    t0 = time.perf_counter()
+    memo = analysis_memo()
+    t1 = time.perf_counter()
+    REQUEST_STAGE_SECONDS.observe(t1 - t0, endpoint="analyze", stage="memo")
+    if memo is None:
         return jsonify({"error": "No data", "results": []})
+    fmt = negotiate()
+    if fmt is None:
+        return jsonify({"error": "Unsupported format"}), 406
+    gz = request.accept_encodings["gzip"] > 0
+    if not_modified(memo.tag, fmt, gz):
+        return encoded_response(b"", fmt, memo.tag, gz, memo.modified)
     
-    results = []
-    
-    for t, df in stock_data_cache.items():
-        a = analyze(t, df)
-        if a and a.z <= -1.0:
-            results.append(a)
+    args = request.args
+    filtered = any(k in args for k in FILTERS)
+    if filtered:
+        top = max(0, args.get("top", 10, type=int))
+        z_max = args.get("z_max", -1.0, type=float)
+        min_prob = args.get("min_prob", 0.0, type=float)
+        signals = {x.strip().upper() for x in args.get("signal", "").split(",") if x.strip()}
+        max_corr = args.get("max_corr", DEDUPE_CORR, type=float)
+        keep = [k for k, r in enumerate(memo.rows)
+                if r["z_score"] <= z_max and r["reversion_probability"] >= min_prob
+                and (not signals or r["signal_strength"] in signals)]
+        picked, found = memo.pick(keep, top, max_corr), len(keep)
+        REQUEST_STAGE_SECONDS.observe(time.perf_counter() - t1, endpoint="analyze", stage="filter")
+    else:
+        picked, found = memo.default, memo.found
     
-    results.sort(key=lambda x: x.prob, reverse=True)
-    top = results[:10]
+    # Unfiltered responses are encoded once per generation and format
+    key = None if filtered else (fmt, gz)
+    body = memo.encoded.get(key) if key else None
+    if body is None:
+        t2 = time.perf_counter()
+        if fmt == "json":
+            body = formats.dumps_json(memo.payload(picked, found))
+        elif fmt == "compact":
+            body = formats.dumps_json(memo.compact(picked, found))
+        elif fmt == "msgpack":
+            body = formats.dumps_msgpack(memo.compact(picked, found))
+        else:
+            c = memo.compact(picked, found)
+            body = formats.table_arrow(c["columns"], {"total_analyzed": c["total_analyzed"],
+                                                      "candidates_found": c["candidates_found"]})
+        if gz:
+            body = formats.compress(body)
+        REQUEST_STAGE_SECONDS.observe(time.perf_counter() - t2, endpoint="analyze", stage="serialize")
+        if key:
+            memo.encoded[key] = body
     
-    return jsonify({
-        "results": [{
-            "ticker": r.ticker,
-            "company_name": r.name,
-            "current_price": r.price,
-            "mean_price": r.mean,
-            "std_dev": r.std,
-            "z_score": r.z,
-            "gap_from_mean": r.gap,
-            "gap_percentage": r.gap_pct,
-            "rsi": r.rsi,
-            "half_life": r.half_life,
-            "reversion_probability": r.prob,
-            "expected_days": r.days,
-            "signal_strength": r.signal,
-            "prices": r.prices,
-            "dates": r.dates,
-            "gap_history": r.gap_hist
-        } for r in top],
-        "total_analyzed": len(stock_data_cache),
-        "candidates_found": len(results)
-    })
+    return encoded_response(body, fmt, memo.tag, gz, memo.modified)
+
+
+@app.route('/api/series')
+def api_series():
+    """Chart series for ?tickers=A,B,... on a shared date axis"""
+    memo = analysis_memo()
+    if memo is None:
+        return jsonify({"error": "No data"})
+    fmt = negotiate(allowed=("json", "msgpack"))
+    if fmt is None:
+        return jsonify({"error": "Unsupported format"}), 406
+    tickers = [t.strip() for t in request.args.get("tickers", "").split(",") if t.strip()][:100]
+    gz = request.accept_encodings["gzip"] > 0
+    tag = "%s-s%x" % (memo.tag, zlib.crc32(",".join(tickers).encode()))
+    if not_modified(tag, fmt, gz):
+        return encoded_response(b"", fmt, tag, gz, memo.modified)
+    data = memo.chart_series(tickers)
+    if fmt == "msgpack":
+        for v in data["series"].values():
+            v["prices"], v["gap_history"] = v["prices"].tolist(), v["gap_history"].tolist()
+        body = formats.dumps_msgpack(data)
+    else:
+        for v in data["series"].values():
+            for k in ("prices", "gap_history"):
+                v[k] = [None if x != x else round(x, 2) for x in v[k].tolist()]
+        body = formats.dumps_json(data)
+    if gz:
+        body = formats.compress(body)
+    return encoded_response(body, fmt, tag, gz, memo.modified)
+
+
+@app.route('/metrics')
+def api_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.before_request
+def _before():
+    g.t0 = time.perf_counter()
+    startup()
+    token = PROFILE_TOKEN and (request.headers.get('X-Profile') or request.args.get('_profile'))
+    if token and token == PROFILE_TOKEN:
+        g.profiler = metrics.SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL).start()
+
+
+@app.after_request
+def _after(resp):
+    endpoint = request.endpoint or "unknown"
+    REQUEST_SECONDS.observe(time.perf_counter() - g.t0, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=str(resp.status_code))
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return resp
+    stacks = profiler.stop()
+    if resp.is_streamed:
+        return resp
+    # The profile replaces the body so it can be piped into a flamegraph tool
+    out = Response(stacks, mimetype='text/plain')
+    out.headers['X-Profile-Samples'] = str(sum(profiler.stacks.values()))
+    return out
 
 
 @app.route('/')
@@ -291,7 +880,7 @@ def index():
     return HTML
 
 
-HTML = '''<!DOCTYPE html><html><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1.0"><title>S&P 500 Oversold Stock Scanner</title><script src="https://cdnjs.cloudflare.com/ajax/libs/Chart.js/4.4.1/chart.umd.min.js"></script><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:-apple-system,sans-serif;background:linear-gradient(135deg,#0f172a,#1e293b,#0f172a);min-height:100vh;color:#e2e8f0}.container{max-width:1400px;margin:0 auto;padding:20px}.header{text-align:center;padding:40px 20px;margin-bottom:30px}.header h1{font-size:2.2rem;font-weight:700;background:linear-gradient(135deg,#22c55e,#34d399);-webkit-background-clip:text;-webkit-text-fill-color:transparent;margin-bottom:10px}.header p{color:#94a3b8}.header .subtitle{font-size:0.9rem;color:#22c55e;margin-top:8px}.controls{background:rgba(30,41,59,0.8);border:1px solid rgba(71,85,105,0.5);border-radius:16px;padding:24px;margin-bottom:30px;display:flex;align-items:center;gap:20px;flex-wrap:wrap}.btn{padding:14px 28px;border-radius:10px;border:none;font-size:15px;font-weight:600;cursor:pointer}.btn-primary{background:linear-gradient(135deg,#3b82f6,#2563eb);color:white}.btn-success{background:linear-gradient(135deg,#22c55e,#16a34a);color:white}.btn:disabled{background:#475569;cursor:not-allowed}.btn:hover:not(:disabled){transform:translateY(-2px);box-shadow:0 8px 20px rgba(59,130,246,0.4)}.progress-section{flex:1;min-width:200px}.progress-bar{height:8px;background:#334155;border-radius:4px;overflow:hidden;margin-bottom:8px}.progress-fill{height:100%;background:linear-gradient(90deg,#22c55e,#34d399);transition:width 0.3s}.progress-text{font-size:13px;color:#94a3b8}.hidden{display:none!important}.stats-grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(180px,1fr));gap:16px;margin-bottom:30px}.stat-card{background:rgba(30,41,59,0.6);border:1px solid rgba(71,85,105,0.3);border-radius:12px;padding:20px;text-align:center}.stat-label{color:#94a3b8;font-size:12px;text-transform:uppercase}.stat-value{font-size:28px;font-weight:700;margin-top:8px}.stat-value.green{color:#34d399}.stat-value.blue{color:#60a5fa}.results-grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(380px,1fr));gap:24px}.stock-card{background:rgba(30,41,59,0.8);border:1px solid rgba(34,197,94,0.3);border-radius:16px;padding:24px;transition:all 0.3s}.stock-card:hover{transform:translateY(-4px);box-shadow:0 12px 40px rgba(34,197,94,0.2);border-color:rgba(34,197,94,0.5)}.stock-header{display:flex;justify-content:space-between;margin-bottom:16px;padding-bottom:16px;border-bottom:1px solid rgba(71,85,105,0.3)}.stock-ticker{font-size:22px;font-weight:700}.stock-company{font-size:13px;color:#94a3b8;margin-top:4px}.prob-value{font-size:26px;font-weight:700;color:#34d399}.prob-label{font-size:11px;color:#94a3b8}.metrics-grid{display:grid;grid-template-columns:repeat(3,1fr);gap:10px;margin-bottom:16px}.metric{background:rgba(15,23,42,0.5);border-radius:8px;padding:10px;text-align:center}.metric-label{font-size:10px;color:#64748b;text-transform:uppercase}.metric-value{font-size:14px;font-weight:600;margin-top:4px}.metric-value.positive{color:#34d399}.metric-value.negative{color:#f87171}.signal-badge{display:inline-block;padding:6px 14px;border-radius:20px;font-size:11px;font-weight:600;margin-bottom:12px;background:rgba(34,197,94,0.2);color:#34d399}.signal-badge.strong{background:rgba(34,197,94,0.3);color:#22c55e}.chart-container{height:180px;margin-top:12px;background:rgba(15,23,42,0.3);border-radius:8px;padding:10px}.empty-state{text-align:center;padding:80px 20px;color:#64748b}.empty-state h3{font-size:22px;color:#94a3b8;margin-bottom:12px}.footer{text-align:center;padding:40px 20px;color:#64748b;font-size:13px}</style></head><body><div class="container"><header class="header"><h1>S&P 500 Oversold Stock Scanner</h1><p>Top 10 OVERSOLD stocks most likely to revert to their mean within 30 days</p><p class="subtitle">🟢 LONG OPPORTUNITIES ONLY - Using 1 Year of Yahoo Finance Data</p></header><div class="controls"><button class="btn btn-success" id="fetchBtn">Fetch S&P 500 Data</button><div class="progress-section hidden" id="progressSection"><div class="progress-bar"><div class="progress-fill" id="progressFill" style="width:0%"></div></div><p class="progress-text" id="progressText">Starting...</p></div><button class="btn btn-primary" id="analyzeBtn" disabled>Find Top 10 Oversold</button></div><div class="stats-grid"><div class="stat-card"><p class="stat-label">Stocks Loaded</p><p class="stat-value" id="stocksLoaded">0</p></div><div class="stat-card"><p class="stat-label">Oversold Found</p><p class="stat-value green" id="candidatesFound">-</p></div><div class="stat-card"><p class="stat-label">Avg Probability</p><p class="stat-value blue" id="avgProbability">-</p></div><div class="stat-card"><p class="stat-label">Last Updated</p><p class="stat-value" id="lastUpdated" style="font-size:16px">-</p></div></div><div id="resultsContainer"><div class="empty-state"><h3>No Analysis Yet</h3><p>Click "Fetch S&P 500 Data" then "Find Top 10 Oversold"</p></div></div><footer class="footer"><p>Oversold Stock Scanner | Data from Yahoo Finance | LONG positions only | For informational purposes</p></footer></div><script>let charts={},poll=null;fetch("/api/status").then(r=>r.json()).then(d=>{document.getElementById("stocksLoaded").textContent=d.stocks_loaded;if(d.stocks_loaded>0){document.getElementById("analyzeBtn").disabled=false;if(d.last_fetch)document.getElementById("lastUpdated").textContent=d.last_fetch.split(" ")[1]}});document.getElementById("fetchBtn").onclick=function(){this.disabled=true;document.getElementById("progressSection").classList.remove("hidden");document.getElementById("progressFill").style.width="0%";fetch("/api/fetch",{method:"POST"}).then(r=>r.json()).then(d=>{if(d.error){alert(d.error);document.getElementById("fetchBtn").disabled=false;return}poll=setInterval(pollStatus,1000)})};function pollStatus(){fetch("/api/status").then(r=>r.json()).then(d=>{document.getElementById("stocksLoaded").textContent=d.stocks_loaded;if(d.in_progress){const p=d.total>0?(d.completed/d.total*100):0;document.getElementById("progressFill").style.width=p+"%";document.getElementById("progressText").textContent=d.message}else{clearInterval(poll);document.getElementById("progressFill").style.width="100%";document.getElementById("progressText").textContent=d.message;document.getElementById("fetchBtn").disabled=false;if(d.stocks_loaded>0){document.getElementById("analyzeBtn").disabled=false;if(d.last_fetch)document.getElementById("lastUpdated").textContent=d.last_fetch.split(" ")[1]}}})}document.getElementById("analyzeBtn").onclick=function(){this.disabled=true;this.textContent="Analyzing...";fetch("/api/analyze").then(r=>r.json()).then(d=>{if(d.error)alert(d.error);else render(d);this.disabled=false;this.textContent="Find Top 10 Oversold"})};function render(d){document.getElementById("candidatesFound").textContent=d.candidates_found;if(d.results.length>0){const avg=d.results.reduce((s,r)=>s+r.reversion_probability,0)/d.results.length;document.getElementById("avgProbability").textContent=(avg*100).toFixed(1)+"%"}const c=document.getElementById("resultsContainer");if(d.results.length===0){c.innerHTML='<div class="empty-state"><h3>No Oversold Candidates Found</h3><p>No stocks currently meet the oversold criteria (Z-score ≤ -1.0)</p></div>';return}let h='<div class="results-grid">';d.results.forEach((s,i)=>{const sigClass=s.signal_strength.includes("STRONG")?"strong":"";h+=`<div class="stock-card"><div class="stock-header"><div><div class="stock-ticker">#${i+1} ${s.ticker}</div><div class="stock-company">${s.company_name}</div></div><div style="text-align:right"><div class="prob-value">${(s.reversion_probability*100).toFixed(1)}%</div><div class="prob-label">Reversion Prob.</div></div></div><span class="signal-badge ${sigClass}">${s.signal_strength}</span><div class="metrics-grid"><div class="metric"><div class="metric-label">Current</div><div class="metric-value">$${s.current_price.toFixed(2)}</div></div><div class="metric"><div class="metric-label">Mean (Target)</div><div class="metric-value positive">$${s.mean_price.toFixed(2)}</div></div><div class="metric"><div class="metric-label">Upside</div><div class="metric-value positive">+${Math.abs(s.gap_percentage).toFixed(1)}%</div></div><div class="metric"><div class="metric-label">Z-Score</div><div class="metric-value negative">${s.z_score.toFixed(2)}σ</div></div><div class="metric"><div class="metric-label">RSI</div><div class="metric-value">${s.rsi.toFixed(1)}</div></div><div class="metric"><div class="metric-label">Exp. Days</div><div class="metric-value">${s.expected_days.toFixed(0)}</div></div></div><div class="chart-container"><canvas id="chart-${s.ticker}"></canvas></div></div>`});h+="</div>";c.innerHTML=h;d.results.forEach(s=>chart(s))}function chart(s){const cv=document.getElementById("chart-"+s.ticker);if(!cv)return;if(charts[s.ticker])charts[s.ticker].destroy();const lb=s.dates.map(d=>{const dt=new Date(d);return(dt.getMonth()+1)+"/"+dt.getDate()});charts[s.ticker]=new Chart(cv.getContext("2d"),{type:"line",data:{labels:lb,datasets:[{label:"Gap from Mean ($)",data:s.gap_history,borderColor:"#f87171",backgroundColor:"rgba(248,113,113,0.1)",borderWidth:2,fill:true,tension:0.3,pointRadius:0},{label:"Mean (Target)",data:Array(s.prices.length).fill(0),borderColor:"#22c55e",borderWidth:2,borderDash:[5,5],fill:false,pointRadius:0}]},options:{responsive:true,maintainAspectRatio:false,plugins:{legend:{display:true,position:"top",labels:{color:"#94a3b8",boxWidth:10,padding:6,font:{size:9}}}},scales:{x:{grid:{color:"rgba(71,85,105,0.2)"},ticks:{color:"#64748b",maxTicksLimit:5,font:{size:9}}},y:{grid:{color:"rgba(71,85,105,0.2)"},ticks:{color:"#64748b",font:{size:9},callback:v=>"$"+v.toFixed(0)}}}}})}</script></body></html>'''
+HTML = '''<!DOCTYPE html><html><head><meta charset="UTF-8"><meta name="viewport" content="width=device-width,initial-scale=1.0"><title>S&P 500 Oversold Stock Scanner</title><script src="https://cdnjs.cloudflare.com/ajax/libs/Chart.js/4.4.1/chart.umd.min.js"></script><style>*{margin:0;padding:0;box-sizing:border-box}body{font-family:-apple-system,sans-serif;background:linear-gradient(135deg,#0f172a,#1e293b,#0f172a);min-height:100vh;color:#e2e8f0}.container{max-width:1400px;margin:0 auto;padding:20px}.header{text-align:center;padding:40px 20px;margin-bottom:30px}.header h1{font-size:2.2rem;font-weight:700;background:linear-gradient(135deg,#22c55e,#34d399);-webkit-background-clip:text;-webkit-text-fill-color:transparent;margin-bottom:10px}.header p{color:#94a3b8}.header .subtitle{font-size:0.9rem;color:#22c55e;margin-top:8px}.controls{background:rgba(30,41,59,0.8);border:1px solid rgba(71,85,105,0.5);border-radius:16px;padding:24px;margin-bottom:30px;display:flex;align-items:center;gap:20px;flex-wrap:wrap}.btn{padding:14px 28px;border-radius:10px;border:none;font-size:15px;font-weight:600;cursor:pointer}.btn-primary{background:linear-gradient(135deg,#3b82f6,#2563eb);color:white}.btn-success{background:linear-gradient(135deg,#22c55e,#16a34a);color:white}.btn:disabled{background:#475569;cursor:not-allowed}.btn:hover:not(:disabled){transform:translateY(-2px);box-shadow:0 8px 20px rgba(59,130,246,0.4)}.progress-section{flex:1;min-width:200px}.progress-bar{height:8px;background:#334155;border-radius:4px;overflow:hidden;margin-bottom:8px}.progress-fill{height:100%;background:linear-gradient(90deg,#22c55e,#34d399);transition:width 0.3s}.progress-text{font-size:13px;color:#94a3b8}.hidden{display:none!important}.stats-grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(180px,1fr));gap:16px;margin-bottom:30px}.stat-card{background:rgba(30,41,59,0.6);border:1px solid rgba(71,85,105,0.3);border-radius:12px;padding:20px;text-align:center}.stat-label{color:#94a3b8;font-size:12px;text-transform:uppercase}.stat-value{font-size:28px;font-weight:700;margin-top:8px}.stat-value.green{color:#34d399}.stat-value.blue{color:#60a5fa}.results-grid{display:grid;grid-template-columns:repeat(auto-fit,minmax(380px,1fr));gap:24px}.stock-card{background:rgba(30,41,59,0.8);border:1px solid rgba(34,197,94,0.3);border-radius:16px;padding:24px;transition:all 0.3s}.stock-card:hover{transform:translateY(-4px);box-shadow:0 12px 40px rgba(34,197,94,0.2);border-color:rgba(34,197,94,0.5)}.stock-header{display:flex;justify-content:space-between;margin-bottom:16px;padding-bottom:16px;border-bottom:1px solid rgba(71,85,105,0.3)}.stock-ticker{font-size:22px;font-weight:700}.stock-company{font-size:13px;color:#94a3b8;margin-top:4px}.prob-value{font-size:26px;font-weight:700;color:#34d399}.prob-label{font-size:11px;color:#94a3b8}.metrics-grid{display:grid;grid-template-columns:repeat(3,1fr);gap:10px;margin-bottom:16px}.metric{background:rgba(15,23,42,0.5);border-radius:8px;padding:10px;text-align:center}.metric-label{font-size:10px;color:#64748b;text-transform:uppercase}.metric-value{font-size:14px;font-weight:600;margin-top:4px}.metric-value.positive{color:#34d399}.metric-value.negative{color:#f87171}.signal-badge{display:inline-block;padding:6px 14px;border-radius:20px;font-size:11px;font-weight:600;margin-bottom:12px;background:rgba(34,197,94,0.2);color:#34d399}.signal-badge.strong{background:rgba(34,197,94,0.3);color:#22c55e}.chart-container{height:180px;margin-top:12px;background:rgba(15,23,42,0.3);border-radius:8px;padding:10px}.empty-state{text-align:center;padding:80px 20px;color:#64748b}.empty-state h3{font-size:22px;color:#94a3b8;margin-bottom:12px}.footer{text-align:center;padding:40px 20px;color:#64748b;font-size:13px}</style></head><body><div class="container"><header class="header"><h1>S&P 500 Oversold Stock Scanner</h1><p>Top 10 OVERSOLD stocks most likely to revert to their mean within 30 days</p><p class="subtitle">🟢 LONG OPPORTUNITIES ONLY - Using 1 Year of Yahoo Finance Data</p></header><div class="controls"><button class="btn btn-success" id="fetchBtn">Fetch S&P 500 Data</button><div class="progress-section hidden" id="progressSection"><div class="progress-bar"><div class="progress-fill" id="progressFill" style="width:0%"></div></div><p class="progress-text" id="progressText">Starting...</p></div><button class="btn btn-primary" id="analyzeBtn" disabled>Find Top 10 Oversold</button></div><div class="stats-grid"><div class="stat-card"><p class="stat-label">Stocks Loaded</p><p class="stat-value" id="stocksLoaded">0</p></div><div class="stat-card"><p class="stat-label">Oversold Found</p><p class="stat-value green" id="candidatesFound">-</p></div><div class="stat-card"><p class="stat-label">Avg Probability</p><p class="stat-value blue" id="avgProbability">-</p></div><div class="stat-card"><p class="stat-label">Last Updated</p><p class="stat-value" id="lastUpdated" style="font-size:16px">-</p></div></div><div id="resultsContainer"><div class="empty-state"><h3>No Analysis Yet</h3><p>Click "Fetch S&P 500 Data" then "Find Top 10 Oversold"</p></div></div><footer class="footer"><p>Oversold Stock Scanner | Data from Yahoo Finance | LONG positions only | For informational purposes</p></footer></div><script>let charts={},poll=null;fetch("/api/status").then(r=>r.json()).then(d=>{document.getElementById("stocksLoaded").textContent=d.stocks_loaded;if(d.stocks_loaded>0){document.getElementById("analyzeBtn").disabled=false;if(d.last_fetch)document.getElementById("lastUpdated").textContent=d.last_fetch.split(" ")[1]}});document.getElementById("fetchBtn").onclick=function(){this.disabled=true;document.getElementById("progressSection").classList.remove("hidden");document.getElementById("progressFill").style.width="0%";fetch("/api/fetch",{method:"POST"}).then(r=>r.json()).then(d=>{if(d.error){alert(d.error);document.getElementById("fetchBtn").disabled=false;return}watch()})};function watch(){if(!window.EventSource){poll=setInterval(pollStatus,1000);return}const es=new EventSource("/api/stream");es.addEventListener("progress",e=>showStatus(JSON.parse(e.data)));es.addEventListener("partial",e=>render(JSON.parse(e.data),true));es.addEventListener("done",e=>{es.close();showStatus(JSON.parse(e.data))});es.onerror=()=>{es.close();poll=setInterval(pollStatus,1000)}}function pollStatus(){fetch("/api/status").then(r=>r.json()).then(showStatus)}function showStatus(d){document.getElementById("stocksLoaded").textContent=d.stocks_loaded;if(d.in_progress){const p=d.total>0?(d.completed/d.total*100):0;document.getElementById("progressFill").style.width=p+"%";document.getElementById("progressText").textContent=d.message}else{clearInterval(poll);document.getElementById("progressFill").style.width="100%";document.getElementById("progressText").textContent=d.message;document.getElementById("fetchBtn").disabled=false;if(d.stocks_loaded>0){document.getElementById("analyzeBtn").disabled=false;if(d.last_fetch)document.getElementById("lastUpdated").textContent=d.last_fetch.split(" ")[1]}}}document.getElementById("analyzeBtn").onclick=function(){this.disabled=true;this.textContent="Analyzing...";fetch("/api/analyze?format=compact").then(r=>r.json()).then(d=>{if(d.error)alert(d.error);else render(rows(d));this.disabled=false;this.textContent="Find Top 10 Oversold"})};function rows(d){const c=d.columns;return{candidates_found:d.candidates_found,results:c.ticker.map((t,i)=>{const o={};for(const k in c)o[k]=c[k][i];return o})}}function loadSeries(rs){const need=rs.filter(s=>!s.dates).map(s=>s.ticker);if(!need.length){rs.forEach(chart);return}fetch("/api/series?tickers="+encodeURIComponent(need.join(","))).then(r=>r.json()).then(x=>{rs.forEach(s=>{const v=x.series&&x.series[s.ticker];if(v){s.dates=x.dates;s.prices=v.prices;s.gap_history=v.gap_history}chart(s)})})}function render(d,lite){document.getElementById("candidatesFound").textContent=d.candidates_found;if(d.results.length>0){const avg=d.results.reduce((s,r)=>s+r.reversion_probability,0)/d.results.length;document.getElementById("avgProbability").textContent=(avg*100).toFixed(1)+"%"}const c=document.getElementById("resultsContainer");if(d.results.length===0){c.innerHTML='<div class="empty-state"><h3>No Oversold Candidates Found</h3><p>No stocks currently meet the oversold criteria (Z-score ≤ -1.0)</p></div>';return}let h='<div class="results-grid">';d.results.forEach((s,i)=>{const sigClass=s.signal_strength.includes("STRONG")?"strong":"";h+=`<div class="stock-card"><div class="stock-header"><div><div class="stock-ticker">#${i+1} ${s.ticker}</div><div class="stock-company">${s.company_name}</div></div><div style="text-align:right"><div class="prob-value">${(s.reversion_probability*100).toFixed(1)}%</div><div class="prob-label">Reversion Prob.</div></div></div><span class="signal-badge ${sigClass}">${s.signal_strength}</span><div class="metrics-grid"><div class="metric"><div class="metric-label">Current</div><div class="metric-value">$${s.current_price.toFixed(2)}</div></div><div class="metric"><div class="metric-label">Mean (Target)</div><div class="metric-value positive">$${s.mean_price.toFixed(2)}</div></div><div class="metric"><div class="metric-label">Upside</div><div class="metric-value positive">+${Math.abs(s.gap_percentage).toFixed(1)}%</div></div><div class="metric"><div class="metric-label">Z / Peer Z</div><div class="metric-value negative">${s.z_score.toFixed(2)}σ${s.peer_z!=null?" / "+s.peer_z.toFixed(2):""}</div></div><div class="metric"><div class="metric-label">RSI</div><div class="metric-value">${s.rsi.toFixed(1)}</div></div><div class="metric"><div class="metric-label">Exp. Days</div><div class="metric-value">${s.expected_days.toFixed(0)}</div></div></div><div class="chart-container"><canvas id="chart-${s.ticker}"></canvas></div></div>`});h+="</div>";c.innerHTML=h;if(!lite)loadSeries(d.results)}function chart(s){const cv=document.getElementById("chart-"+s.ticker);if(!cv||!s.dates)return;if(charts[s.ticker])charts[s.ticker].destroy();const lb=s.dates.map(d=>{const dt=new Date(d);return(dt.getMonth()+1)+"/"+dt.getDate()});charts[s.ticker]=new Chart(cv.getContext("2d"),{type:"line",data:{labels:lb,datasets:[{label:"Gap from Mean ($)",data:s.gap_history,borderColor:"#f87171",backgroundColor:"rgba(248,113,113,0.1)",borderWidth:2,fill:true,tension:0.3,pointRadius:0},{label:"Mean (Target)",data:Array(s.prices.length).fill(0),borderColor:"#22c55e",borderWidth:2,borderDash:[5,5],fill:false,pointRadius:0}]},options:{responsive:true,maintainAspectRatio:false,plugins:{legend:{display:true,position:"top",labels:{color:"#94a3b8",boxWidth:10,padding:6,font:{size:9}}}},scales:{x:{grid:{color:"rgba(71,85,105,0.2)"},ticks:{color:"#64748b",maxTicksLimit:5,font:{size:9}}},y:{grid:{color:"rgba(71,85,105,0.2)"},ticks:{color:"#64748b",font:{size:9},callback:v=>"$"+v.toFixed(0)}}}}})}</script></body></html>'''
 
 
 if __name__ == '__main__':
@@ -303,4 +892,5 @@ if __name__ == '__main__':
     print(f"\n   Open: http://127.0.0.1:{port}")
     print("\n   Press Ctrl+C to stop")
     print("=" * 60 + "\n")
+    startup()
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Walk-forward backtest of the reversion probability model
+
+Every rolling 100-bar window of every ticker is scored exactly as
+app.analyze() would score it on that date. Each oversold call (z <= -1) is
+then checked against the following bars: it counts as a hit if the close
+gets back to the window mean within the predicted `days`. Hit rates are
+reported by signal label, by 0.1-wide probability bin and by probability
+decile of the run. Work is split across a process pool by ticker shard and
+runs fully offline. Stores need the history first, e.g. from
+POST /api/fetch?backfill_days=3650.
+
+    python backtest.py --store data --years 10
+    python backtest.py --synthetic 500 --years 10
+"""
+
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import analysis
+import synthetic
+
+WINDOW = 100
+MAX_DAYS = 45
+N_BINS = 10
+FINE = 1000  # probability resolution of the accumulators; bins and deciles are built from it
+SIGNALS = list(analysis.SIGNALS)
+FIELDS = ("n", "hits", "prob", "days", "ttr")
+
+
+def empty() -> Dict[str, np.ndarray]:
+    """Accumulators: rows 0-3 are signal labels, the rest FINE-wide probability bins"""
+    return {f: np.zeros(len(SIGNALS) + FINE) for f in FIELDS}
+
+
+def score(p: np.ndarray, z_max: float = -1.0) -> Dict[str, np.ndarray]:
+    """Score every window of one close series and record realized reversion"""
+    acc = empty()
+    if len(p) < WINDOW + 1:
+        return acc
+    # Only windows with at least one following bar can be evaluated
+    win = sliding_window_view(p, WINDOW)[:-1]
+    mean, std = win.mean(axis=1), win.std(axis=1)
+    cur = win[:, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (cur - mean) / std
+    keep = (std >= 0.01) & (np.round(z, 2) <= z_max)
+    if not keep.any():
+        return acc
+    idx = np.flatnonzero(keep)
+    win, mean, z = win[idx], mean[idx], z[idx]
+    r, hl = analysis.rsi_batch(win), analysis.half_life_batch(win)
+    pr = analysis.prob_batch(z, r, hl)
+    days = np.clip(hl * (1 + 0.5 * np.abs(z)), 3, 45)
+    sig = analysis.signal_index(z, r)
+
+    # First bar after the window whose close reaches the window mean
+    end = idx + WINDOW - 1
+    ttr = np.full(len(idx), np.inf)
+    for h in range(MAX_DAYS, 0, -1):
+        j = end + h
+        ok = j < len(p)
+        hit = np.zeros(len(idx), dtype=bool)
+        hit[ok] = p[j[ok]] >= mean[ok]
+        ttr[hit] = h
+    horizon = np.ceil(days)
+    hits = ttr <= horizon
+    # Misses whose horizon runs past the data are undecided, not failures
+    decided = hits | (end + horizon < len(p))
+
+    h, pr, days, ttr = hits[decided], pr[decided], days[decided], ttr[decided]
+    for b in (sig[decided], len(SIGNALS) + np.clip((pr * FINE).astype(int), 0, FINE - 1)):
+        np.add.at(acc["n"], b, 1)
+        np.add.at(acc["hits"], b, h)
+        np.add.at(acc["prob"], b, pr)
+        np.add.at(acc["days"], b, days)
+        np.add.at(acc["ttr"], b[h], ttr[h])
+    return acc
+
+
+def merge(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    total = empty()
+    for part in parts:
+        for f in FIELDS:
+            total[f] += part[f]
+    return total
+
+
+def _store_shard(args) -> Dict[str, np.ndarray]:
+    root, tickers, bars = args
+    from store import PriceStore
+    store = PriceStore(root)
+    parts = []
+    for t in tickers:
+        b = store.bars(t)
+        if b is not None:
+            parts.append(score(np.array(b['close'][-bars:])))
+    return merge(parts)
+
+
+def _synthetic_shard(args) -> Dict[str, np.ndarray]:
+    indices, bars, seed = args
+    closes = synthetic.series(bars, indices, seed)
+    return merge([score(p) for p in closes])
+
+
+def run(store: Optional[str] = None, tickers: Optional[List[str]] = None, n_synthetic: int = 0,
+        bars: int = 2520, seed: int = 0, workers: Optional[int] = None, shard: int = 25) -> dict:
+    """Backtest a store (or synthetic universe) and return the bucket report"""
+    workers = workers or os.cpu_count() or 1
+    if store:
+        from store import PriceStore
+        names = tickers or PriceStore(store).tickers()
+        jobs = [(store, names[i:i + shard], bars) for i in range(0, len(names), shard)]
+        fn = _store_shard
+    else:
+        names = synthetic.tickers(n_synthetic)
+        jobs = [(list(range(i, min(i + shard, n_synthetic))), bars, seed)
+                for i in range(0, n_synthetic, shard)]
+        fn = _synthetic_shard
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            total = merge(list(pool.map(fn, jobs)))
+    else:
+        total = merge([fn(j) for j in jobs])
+    return report(total, len(names))
+
+
+def group(acc: Dict[str, np.ndarray], groups: np.ndarray, n_groups: int) -> Dict[str, np.ndarray]:
+    """Sum the fine probability bins into n_groups buckets"""
+    fine = slice(len(SIGNALS), None)
+    return {f: np.bincount(groups, weights=acc[f][fine], minlength=n_groups) for f in FIELDS}
+
+
+def deciles(n: np.ndarray) -> np.ndarray:
+    """Decile of each fine bin from the run's own probability distribution.
+
+    A fine bin is never split, so heavily tied probabilities (the model
+    clamps to [0.15, 0.95]) can leave a decile empty or oversized.
+    """
+    total = n.sum()
+    if not total:
+        return np.zeros(len(n), dtype=int)
+    before = np.cumsum(n) - n
+    return np.minimum((before * N_BINS / total).astype(int), N_BINS - 1)
+
+
+def report(acc: Dict[str, np.ndarray], n_tickers: int) -> dict:
+    sig = {f: acc[f][:len(SIGNALS)] for f in FIELDS}
+    width = FINE // N_BINS
+    bins = group(acc, np.arange(FINE) // width, N_BINS)
+    dec = deciles(acc["n"][len(SIGNALS):])
+    by_dec = group(acc, dec, N_BINS)
+    edges = [np.flatnonzero((dec == d) & (acc["n"][len(SIGNALS):] > 0)) for d in range(N_BINS)]
+    buckets = [("signal", s, sig, k) for k, s in enumerate(SIGNALS)]
+    buckets += [("probability", f"{i / N_BINS:.1f}-{(i + 1) / N_BINS:.1f}", bins, i) for i in range(N_BINS)]
+    buckets += [("decile", f"D{d + 1} {e[0] / FINE:.3f}-{(e[-1] + 1) / FINE:.3f}", by_dec, d)
+                for d, e in enumerate(edges) if len(e)]
+    rows = []
+    for kind, label, a, k in buckets:
+        n, hits = a["n"][k], a["hits"][k]
+        rows.append({
+            "bucket": label,
+            "kind": kind,
+            "n": int(n),
+            "hit_rate": round(hits / n, 4) if n else None,
+            "mean_prob": round(a["prob"][k] / n, 4) if n else None,
+            "mean_expected_days": round(a["days"][k] / n, 2) if n else None,
+            "mean_days_to_revert": round(a["ttr"][k] / hits, 2) if hits else None
+        })
+    return {"tickers": n_tickers, "window": WINDOW, "buckets": rows}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--store", help="price store directory (see PRICE_STORE)")
+    ap.add_argument("--synthetic", type=int, default=0, help="number of synthetic tickers instead of a store")
+    ap.add_argument("--years", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--json", help="write the report to this file")
+    args = ap.parse_args()
+    if not args.store and not args.synthetic:
+        ap.error("give --store or --synthetic")
+    bars = int(args.years * 252)
+    res = run(store=args.store, n_synthetic=args.synthetic, bars=bars, seed=args.seed, workers=args.workers)
+    print(f"{'bucket':<20}{'n':>10}{'hit rate':>10}{'prob':>8}{'exp days':>10}{'days to revert':>16}")
+    for r in res["buckets"]:
+        if r["n"]:
+            print(f"{r['bucket']:<20}{r['n']:>10}{r['hit_rate']:>10.3f}{r['mean_prob']:>8.3f}"
+                  f"{r['mean_expected_days']:>10.1f}{(r['mean_days_to_revert'] or 0):>16.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Offline stand-in for the parts of yfinance the app calls
+
+install() puts this module in sys.modules['yfinance'], so fetch_data() and
+fetcher.YahooProvider run unchanged against synthetic prices with simulated
+request latency and error rates. Like Yahoo, every symbol costs one request:
+download() pays the latency once per ticker, not once per call.
+"""
+
+import sys
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+
+import synthetic
+
+config = {"latency": 0.05, "error_rate": 0.0, "empty_rate": 0.0, "seed": 0}
+calls = {"history": 0, "download": 0}
+_lock = threading.Lock()
+
+
+def install(**kw):
+    config.update(kw)
+    calls.update(history=0, download=0)
+    sys.modules['yfinance'] = sys.modules[__name__]
+
+
+def _rng(key: str) -> np.random.Generator:
+    return np.random.default_rng([config["seed"]] + [ord(c) for c in key])
+
+
+def _frame(ticker: str, start, end) -> pd.DataFrame:
+    dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), tz="America/New_York")
+    close = synthetic.walk(ticker, dates.tz_localize(None).values.astype('datetime64[D]'), config["seed"])
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": 1_000_000}, index=pd.Index(dates, name="Date"))
+
+
+def _request(kind: str, key: str):
+    with _lock:
+        calls[kind] += 1
+        n = calls[kind]
+    time.sleep(config["latency"])
+    rng = _rng(f"{kind}:{n}:{key}")
+    if rng.random() < config["error_rate"]:
+        raise ConnectionError("simulated Yahoo error")
+    return rng
+
+
+class Ticker:
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+
+    def history(self, start=None, end=None, raise_errors=False, **kw) -> pd.DataFrame:
+        try:
+            rng = _request("history", self.ticker)
+        except ConnectionError:
+            # Like yfinance, errors only propagate when asked to
+            if raise_errors:
+                raise
+            return pd.DataFrame()
+        if rng.random() < config["empty_rate"]:
+            return pd.DataFrame()
+        return _frame(self.ticker, start, end)
+
+
+def download(tickers, start=None, end=None, group_by="column", **kw) -> pd.DataFrame:
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    frames = {}
+    for t in tickers:
+        # yfinance swallows per-symbol errors in download() and leaves the ticker out
+        try:
+            rng = _request("download", t)
+        except ConnectionError:
+            continue
+        if rng.random() >= config["empty_rate"]:
+            frames[t] = _frame(t, start, end)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, axis=1)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the fetch and analysis hot paths
+
+Runs fully offline: prices come from synthetic.py and Yahoo is replaced by
+bench/fake_yfinance.py. Results are written as JSON and, given a baseline,
+compared metric by metric; any regression beyond the threshold exits 1.
+Timings are medians over repeated runs (fast calls repeat for at least half
+a second), and a baseline recorded with different options (sizes, fetch
+tickers, latency, ...) is refused (exit 2).
+
+    python bench/run.py --sizes 500,5000 --out bench_results.json
+    python bench/run.py --baseline bench/baseline.json --threshold 0.3
+    python bench/run.py --save-baseline bench/baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import fake_yfinance
+
+results = {}
+
+
+def record(name, value, unit="ms", better="lower"):
+    results[name] = {"value": round(float(value), 4), "unit": unit, "better": better}
+    print(f"  {name:<44}{value:>12.3f} {unit}")
+
+
+def timed(fn, repeat=5, budget=0.5, cap=200):
+    """Median wall time of fn() in ms; fast calls repeat until budget seconds pass"""
+    times = []
+    start = time.perf_counter()
+    while len(times) < repeat or (len(times) < cap and time.perf_counter() - start < budget):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return float(np.median(times)) * 1000
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_fetch(args):
+    from fetcher import YahooProvider, fetch_universe
+    import synthetic
+    print("fetch")
+    fake_yfinance.install(latency=args.latency, error_rate=args.error_rate)
+    tickers = synthetic.tickers(args.fetch_tickers)
+    t = time.perf_counter()
+    got = fetch_universe(tickers, YahooProvider(), batch_size=args.batch_size, workers=args.workers, backoff=0)
+    dt = time.perf_counter() - t
+    record("fetch.pool.tickers_per_s", len(tickers) / dt, "1/s", "higher")
+    record("fetch.pool.success_rate", len(got) / len(tickers), "ratio", "higher")
+
+    import app
+    sample = tickers[:args.serial_sample]
+    t = time.perf_counter()
+    for tk in sample:
+        app.fetch_data(tk)
+    dt = time.perf_counter() - t
+    record("fetch.serial.tickers_per_s", len(sample) / dt, "1/s", "higher")
+
+
+def bench_analysis(size):
+    import analysis
+    import synthetic
+    import app
+    print(f"analysis n={size}")
+    cache = synthetic.cache(size, 100, seed=1)
+    packed = analysis.pack(cache)
+    s = analysis.scan(packed)
+    record(f"analysis.{size}.pack", timed(lambda: analysis.pack(cache), 3))
+    record(f"analysis.{size}.rsi", timed(lambda: analysis.rsi_batch(packed.closes)))
+    record(f"analysis.{size}.half_life", timed(lambda: analysis.half_life_batch(packed.closes)))
+    record(f"analysis.{size}.scan", timed(lambda: analysis.scan(packed)))
+    record(f"analysis.{size}.rank", timed(lambda: analysis.rank(s)))
+    record(f"analysis.{size}.peak_mb", peak_mb(lambda: analysis.scan(analysis.pack(cache))), "MB")
+
+    import correlation
+    # The previous generation: same tickers, one bar earlier
+    prev = analysis.Packed(packed.tickers, np.roll(packed.closes, 1, axis=1), np.roll(packed.dates, 1, axis=1),
+                           packed.lengths)
+    base = correlation.Correlation.build(prev)
+    corr = correlation.Correlation.build(packed)
+    cand = analysis.rank(s, z_max=-1.0)
+    record(f"analysis.{size}.corr_build", timed(lambda: correlation.Correlation.build(packed), 3))
+    record(f"analysis.{size}.corr_advance", timed(lambda: base.advance(packed), 3))
+    record(f"analysis.{size}.corr_dedupe_top50", timed(lambda: corr.distinct(list(cand), 50, 0.9)))
+    record(f"analysis.{size}.peer_z_top10", timed(lambda: corr.residual_z(cand[:10])))
+
+    # Scalar per-ticker path on a sample, scaled to the universe
+    names = list(cache)[:500]
+    per = timed(lambda: [app.analyze(t, cache[t]) for t in names], 1) / len(names)
+    record(f"analysis.{size}.legacy_analyze_loop", per * size)
+
+
+def bench_endpoint(size):
+    import app
+    import synthetic
+    print(f"endpoint n={size}")
+    cache = synthetic.cache(size, 100, seed=2)
+    client = app.app.test_client()
+    gen = [0]
+
+    def cold():
+        gen[0] += 1
+        app.adopt(cache, gen[0], f"bench-{size}-{gen[0]}", datetime.now(timezone.utc))
+        assert client.get('/api/analyze').status_code == 200
+
+    record(f"endpoint.{size}.analyze_cold", timed(cold, 3))
+    record(f"endpoint.{size}.analyze_warm", timed(lambda: client.get('/api/analyze'), 20))
+    record(f"endpoint.{size}.analyze_filtered",
+           timed(lambda: client.get('/api/analyze?top=50&min_prob=0.5'), 20))
+    etag = client.get('/api/analyze').headers["ETag"]
+    record(f"endpoint.{size}.analyze_304",
+           timed(lambda: client.get('/api/analyze', headers={"If-None-Match": etag}), 20))
+    record(f"endpoint.{size}.peak_mb", peak_mb(cold), "MB")
+
+
+CONFIG = ("sizes", "fetch_tickers", "serial_sample", "latency", "error_rate", "batch_size", "workers", "skip")
+
+
+def config(args) -> dict:
+    """Options that change what is measured; runs are only comparable if these match"""
+    c = {k: getattr(args, k) for k in CONFIG}
+    c["sizes"] = [int(x) for x in args.sizes.split(",") if x]
+    c["skip"] = sorted(x for x in args.skip.split(",") if x)
+    return c
+
+
+def mismatches(baseline, current) -> list:
+    base = baseline.get("meta", {}).get("config")
+    if base is None:
+        return ["baseline has no recorded config"]
+    return [f"{k}: baseline {base.get(k)!r}, this run {current[k]!r}" for k in CONFIG if base.get(k) != current[k]]
+
+
+def compare(baseline, threshold, min_ms):
+    failed = []
+    for name, cur in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base["value"]:
+            continue
+        b, c = base["value"], cur["value"]
+        if cur["better"] == "lower":
+            if cur["unit"] == "ms" and c < min_ms:
+                continue
+            change = (c - b) / b
+        else:
+            change = (b - c) / b
+        if change > threshold:
+            failed.append((name, b, c, change))
+    for name, b, c, change in failed:
+        print(f"REGRESSION {name}: {b} -> {c} ({change:+.0%})")
+    return failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", default="500,5000", help="universe sizes, e.g. 500,5000,50000")
+    ap.add_argument("--fetch-tickers", type=int, default=500)
+    ap.add_argument("--serial-sample", type=int, default=20)
+    ap.add_argument("--latency", type=float, default=0.05, help="fake Yahoo latency per request (s)")
+    ap.add_argument("--error-rate", type=float, default=0.02)
+    ap.add_argument("--batch-size", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--skip", default="", help="comma list of fetch,analysis,endpoint")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline")
+    ap.add_argument("--threshold", type=float, default=0.3, help="allowed relative regression")
+    ap.add_argument("--min-ms", type=float, default=1.0, help="ignore timings below this in comparisons")
+    ap.add_argument("--save-baseline")
+    args = ap.parse_args()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        diff = mismatches(baseline, config(args))
+        if diff:
+            print(f"{args.baseline} was recorded with different options; not comparing:")
+            for d in diff:
+                print(f"  {d}")
+            sys.exit(2)
+
+    # Keep the app's store and shared snapshots out of the real data directory
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    os.environ["PRICE_STORE"] = tmp
+    os.environ["SHARED_DIR"] = os.path.join(tmp, "shared")
+    fake_yfinance.install(latency=args.latency, error_rate=args.error_rate)
+
+    skip = set(args.skip.split(","))
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    if "fetch" not in skip:
+        bench_fetch(args)
+    for size in sizes:
+        if "analysis" not in skip:
+            bench_analysis(size)
+        if "endpoint" not in skip:
+            bench_endpoint(size)
+
+    doc = {
+        "meta": {"time": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "numpy": np.__version__, "machine": platform.machine(), "cpus": os.cpu_count(),
+                 "sizes": sizes, "config": config(args)},
+        "results": results
+    }
+    with open(args.out, "w") as f:
+        json.dump(doc, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(doc, f, indent=2)
+    if args.baseline:
+        if compare(baseline, args.threshold, args.min_ms):
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Cross-sectional return correlations for peer-relative scoring
+
+Correlation keeps the (tickers x window) float32 log-return matrix of one
+generation, with each row standardized so a block of correlations is a
+single BLAS product zs[rows] @ zs.T. No N x N matrix is held: only rows for
+tickers that are actually served (the listed candidates) are correlated,
+a bounded block at a time. When a new generation only appends bars to the
+same tickers, advance() reuses the stored returns, remapped to the new row
+order, and computes logs for the new bars only.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analysis import STAGE_SECONDS, Packed
+
+PEERS = 10
+BLOCK_BYTES = 64 * 2 ** 20  # cap on one block of correlations
+
+
+def log_returns(closes: np.ndarray) -> np.ndarray:
+    """Per-bar log returns as float32; padding and gaps become 0"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = np.diff(np.log(closes), axis=1)
+    return np.nan_to_num(r, nan=0.0, posinf=0.0, neginf=0.0).astype(np.float32)
+
+
+class Correlation:
+    """Standardized return window for one generation's ticker set"""
+
+    def __init__(self, tickers: List[str], x: np.ndarray, last: np.ndarray, last_close: np.ndarray):
+        self.tickers = list(tickers)
+        self.index: Dict[str, int] = {t: i for i, t in enumerate(self.tickers)}
+        self.x = x                    # (N, T) float32 log returns
+        self.last = last              # (N,) date of each row's last bar
+        self.last_close = last_close  # (N,) close of each row's last bar
+        t = x.shape[1]
+        mean = x.mean(axis=1, dtype=np.float64, keepdims=True)
+        sd = x.std(axis=1, dtype=np.float64, keepdims=True)
+        inv = np.divide(1.0, sd * np.sqrt(t), out=np.zeros_like(sd), where=sd > 1e-8)
+        self.zs = ((x - mean) * inv).astype(np.float32)  # unit-norm rows, 0 for flat ones
+
+    @classmethod
+    def build(cls, packed: Packed) -> "Correlation":
+        t0 = time.perf_counter()
+        c = cls(packed.tickers, log_returns(packed.closes), packed.dates[:, -1].copy(),
+                packed.closes[:, -1].copy())
+        STAGE_SECONDS.observe(time.perf_counter() - t0, engine="corr", stage="build")
+        return c
+
+    @property
+    def window(self) -> int:
+        return self.x.shape[1]
+
+    def advance(self, packed: Packed) -> Optional["Correlation"]:
+        """State for packed, rolled forward from this one; None if it must be rebuilt"""
+        if len(packed.tickers) != len(self.tickers) or packed.closes.shape[1] != self.window + 1:
+            return None
+        try:
+            perm = np.fromiter((self.index[t] for t in packed.tickers), dtype=np.int64,
+                               count=len(packed.tickers))
+        except KeyError:
+            return None
+        t0 = time.perf_counter()
+        last, dates = self.last[perm], packed.dates
+        for k in range(self.window):
+            if np.array_equal(dates[:, -1 - k], last):
+                break
+        else:
+            return None
+        # The overlap bar may have been re-fetched (e.g. captured intraday)
+        if not np.array_equal(packed.closes[:, -1 - k], self.last_close[perm]):
+            return None
+        x = self.x[perm]
+        if k:
+            x = np.hstack([x[:, k:], log_returns(packed.closes[:, -1 - k:])])
+        c = Correlation(packed.tickers, x, dates[:, -1].copy(), packed.closes[:, -1].copy())
+        STAGE_SECONDS.observe(time.perf_counter() - t0, engine="corr", stage="roll")
+        return c
+
+    def _block(self) -> int:
+        return max(1, BLOCK_BYTES // (4 * max(len(self.tickers), 1)))
+
+    def rows_corr(self, rows: np.ndarray) -> np.ndarray:
+        """Correlations of the given rows against every row"""
+        return self.zs[rows] @ self.zs.T
+
+    def peers(self, rows: np.ndarray, k: int = PEERS) -> np.ndarray:
+        """(len(rows), k) indices of each row's most correlated other rows"""
+        t0 = time.perf_counter()
+        rows = np.asarray(rows, dtype=np.int64)
+        k = min(k, len(self.tickers) - 1)
+        out = np.empty((len(rows), max(k, 0)), dtype=np.int64)
+        if k > 0:
+            step = self._block()
+            for a in range(0, len(rows), step):
+                part = rows[a:a + step]
+                c = self.rows_corr(part)
+                c[np.arange(len(part)), part] = -np.inf
+                out[a:a + len(part)] = np.argpartition(-c, k - 1, axis=1)[:, :k]
+        STAGE_SECONDS.observe(time.perf_counter() - t0, engine="corr", stage="peers")
+        return out
+
+    def residual_z(self, rows: np.ndarray, k: int = PEERS) -> np.ndarray:
+        """z-score of each row's cumulative return residual against its peer basket.
+
+        Returns are regressed on the equal-weighted mean return of the k most
+        correlated peers; the residuals are cumulated into a relative price
+        path whose last point is scored against the path's own mean and std,
+        like analyze()'s price z. NaN where there are no peers or the path is
+        flat.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        peers = self.peers(rows, k)
+        t0 = time.perf_counter()
+        z = np.full(len(rows), np.nan)
+        if len(rows) and peers.shape[1]:
+            r = self.x[rows].astype(np.float64)
+            m = self.x[peers].mean(axis=1, dtype=np.float64)
+            rc, mc = r - r.mean(axis=1, keepdims=True), m - m.mean(axis=1, keepdims=True)
+            den = np.einsum('ij,ij->i', mc, mc)
+            beta = np.divide(np.einsum('ij,ij->i', rc, mc), den, out=np.zeros_like(den), where=den > 0)
+            path = np.cumsum(r - beta[:, None] * m, axis=1)
+            sd = path.std(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                z = np.where(sd > 1e-8, (path[:, -1] - path.mean(axis=1)) / sd, np.nan)
+        STAGE_SECONDS.observe(time.perf_counter() - t0, engine="corr", stage="residual")
+        return z
+
+    def distinct(self, order: List[int], top: int, max_corr: float) -> List[int]:
+        """Greedy first top rows of order, skipping any correlated above max_corr with one kept"""
+        if max_corr >= 1.0:
+            return list(order[:top])
+        kept: List[int] = []
+        for i in order:
+            if len(kept) >= top:
+                break
+            if not kept or (self.zs[kept] @ self.zs[i]).max() <= max_corr:
+                kept.append(i)
+        return kept
+
+
+def update(engine: Optional[Correlation], packed: Packed) -> Optional[Correlation]:
+    """Roll engine forward to packed, rebuilding when that is not possible.
+
+    Returns None if the state cannot be allocated; callers then skip peer
+    scoring and deduplication.
+    """
+    try:
+        return (engine.advance(packed) if engine is not None else None) or Correlation.build(packed)
+    except MemoryError:
+        return None
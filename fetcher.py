@@ -0,0 +1,168 @@
+"""
+Batched, concurrent price download engine
+
+Tickers are grouped into requests of up to batch_size symbols (capped by the
+provider's max_batch) and the requests run on a bounded thread pool. The
+data source is a provider object so the engine can be driven by Yahoo
+Finance in production or by FakeProvider offline.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import synthetic
+
+logger = logging.getLogger(__name__)
+
+BATCH_SECONDS = metrics.histogram('fetch_batch_seconds', 'Latency of one provider request')
+TICKER_SECONDS = metrics.histogram('fetch_ticker_seconds', 'Latency of the request that delivered each ticker')
+FAILURES = metrics.counter('fetch_failures_total', 'Tickers that could not be loaded, by reason')
+RETRIES = metrics.counter('fetch_retries_total', 'Provider requests retried after an error')
+
+
+def normalize(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """Reduce a Yahoo history frame to tz-naive date/close columns"""
+    if df is None or df.empty:
+        return None
+    df = df.reset_index()
+    df.columns = [str(c).lower() for c in df.columns]
+    if 'date' not in df.columns and 'datetime' in df.columns:
+        df = df.rename(columns={'datetime': 'date'})
+    if 'date' not in df.columns or 'close' not in df.columns:
+        return None
+    df['date'] = pd.to_datetime(df['date'])
+    if df['date'].dt.tz is not None:
+        df['date'] = df['date'].dt.tz_localize(None)
+    df = df[['date', 'close']].dropna()
+    return df.reset_index(drop=True) if not df.empty else None
+
+
+class YahooProvider:
+    """Per-symbol history requests through yfinance.Ticker.
+
+    yf.download() is not usable here: it keeps its results in module-global
+    state that concurrent calls overwrite, and it still issues one request
+    per symbol. Each ticker is therefore its own request, and the pool in
+    fetch_universe() provides the concurrency. raise_errors=True lets
+    request failures reach the retry loop instead of coming back empty.
+    """
+
+    max_batch = 1
+
+    def history(self, tickers: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+        out = {}
+        for t in tickers:
+            df = normalize(yf.Ticker(t).history(start=start, end=end, auto_adjust=True, raise_errors=True))
+            if df is not None:
+                out[t] = df
+        return out
+
+
+class FakeProvider:
+    """Offline provider with simulated latency and failures for load tests"""
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.1, fail_rate: float = 0.0,
+                 batch_fail_rate: float = 0.0, seed: int = 0):
+        self.latency, self.jitter = latency, jitter
+        self.fail_rate, self.batch_fail_rate = fail_rate, batch_fail_rate
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _rng(self, key: str) -> np.random.Generator:
+        return np.random.default_rng([self.seed] + [ord(c) for c in key])
+
+    def prices(self, ticker: str, dates: pd.DatetimeIndex) -> np.ndarray:
+        """Deterministic random-walk closes for ticker, stable across date ranges"""
+        return synthetic.walk(ticker, dates.values.astype('datetime64[D]'), self.seed)
+
+    def history(self, tickers: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        with self._lock:
+            self.calls += 1
+            rng = self._rng(f"{self.calls}:{start}")
+        time.sleep(max(0.0, self.latency + self.jitter * (rng.random() * 2 - 1)))
+        if rng.random() < self.batch_fail_rate:
+            raise ConnectionError("simulated batch failure")
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        out = {}
+        for t in tickers:
+            if rng.random() < self.fail_rate:
+                continue
+            out[t] = pd.DataFrame({'date': dates, 'close': self.prices(t, dates)})
+        return out
+
+
+def batches(tickers: List[str], size: int) -> List[List[str]]:
+    """Split tickers into request-sized groups"""
+    size = max(1, size)
+    return [tickers[i:i + size] for i in range(0, len(tickers), size)]
+
+
+def fetch_universe(tickers: List[str], provider=None, days: int = 365, batch_size: int = 50,
+                   workers: int = 4, retries: int = 1, backoff: float = 1.0,
+                   on_result: Optional[Callable[[str, Optional[pd.DataFrame], Optional[str]], None]] = None,
+                   since: Optional[Dict[str, datetime]] = None) -> Dict[str, pd.DataFrame]:
+    """Download history for every ticker using batched requests on a worker pool.
+
+    since maps tickers to the first date to request; other tickers get the
+    last `days` days. Tickers sharing a start date are batched together, at
+    most provider.max_batch per request when the provider sets one.
+
+    on_result(ticker, df, reason) is called once per ticker from the calling
+    thread, so it may update shared state without races against other
+    batches. On failure df is None and reason says why ("empty" or the
+    exception type). Failures are not counted here, since the caller may
+    still fall back to stored data; it records fetch_failures_total once
+    the outcome is final.
+    """
+    provider = provider or YahooProvider()
+    end_date = datetime.now()
+    default = (end_date - timedelta(days=days)).strftime('%Y-%m-%d')
+    end = end_date.strftime('%Y-%m-%d')
+    since = since or {}
+    groups: Dict[str, List[str]] = {}
+    for t in tickers:
+        start = since[t].strftime('%Y-%m-%d') if since.get(t) is not None else default
+        groups.setdefault(start, []).append(t)
+    out: Dict[str, pd.DataFrame] = {}
+
+    def run(start, batch):
+        reason = "empty"
+        for attempt in range(retries + 1):
+            t = time.perf_counter()
+            try:
+                got = provider.history(batch, start, end)
+                elapsed = time.perf_counter() - t
+                BATCH_SECONDS.observe(elapsed)
+                return got, elapsed, "empty"
+            except Exception as e:
+                reason = type(e).__name__
+                logger.warning(f"Batch {batch[0]}..{batch[-1]} failed (attempt {attempt + 1}): {e}")
+                if attempt < retries:
+                    RETRIES.inc()
+                    time.sleep(backoff * (attempt + 1))
+        return {}, 0.0, reason
+
+    size = min(batch_size, getattr(provider, 'max_batch', None) or batch_size)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run, start, b): b
+                   for start, group in groups.items() for b in batches(group, size)}
+        for fut in as_completed(futures):
+            got, elapsed, reason = fut.result()
+            for t in futures[fut]:
+                df = got.get(t)
+                if df is not None:
+                    out[t] = df
+                    TICKER_SECONDS.observe(elapsed)
+                if on_result:
+                    on_result(t, df, None if df is not None else reason)
+    return out
@@ -0,0 +1,63 @@
+"""
+Compact response encodings for /api/analyze and /api/series
+
+Results are sent as columns instead of one object per row. Binary formats
+carry numeric columns as float32; msgpack and Arrow are used only when the
+optional packages are installed.
+"""
+
+import gzip
+import json
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON = 'application/json'
+MSGPACK = 'application/x-msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+NUMERIC = ("current_price", "mean_price", "std_dev", "z_score", "gap_from_mean", "gap_percentage",
+           "rsi", "half_life", "reversion_probability", "expected_days", "peer_z")
+TEXT = ("ticker", "company_name", "signal_strength")
+
+
+def available() -> List[str]:
+    """Mimetypes this process can produce, best first"""
+    return [m for m, ok in ((ARROW, pa is not None), (MSGPACK, msgpack is not None), (JSON, True)) if ok]
+
+
+def columns(rows: List[dict]) -> Dict[str, list]:
+    return {k: [r[k] for r in rows] for k in TEXT + NUMERIC}
+
+
+def dumps_json(payload) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+def dumps_msgpack(payload) -> bytes:
+    return msgpack.packb(payload, use_single_float=True)
+
+
+def table_arrow(cols: Dict[str, list], meta: Dict[str, object]) -> bytes:
+    """Summary columns as an Arrow IPC stream; counts travel as schema metadata"""
+    arrays = {k: pa.array(cols[k], type=pa.string()) for k in TEXT}
+    arrays.update({k: pa.array(np.asarray(cols[k], dtype=np.float32)) for k in NUMERIC})
+    table = pa.table(arrays).replace_schema_metadata({k: str(v) for k, v in meta.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def compress(body: bytes, level: int = 6) -> bytes:
+    return gzip.compress(body, compresslevel=level)
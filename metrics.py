@@ -0,0 +1,189 @@
+"""
+Minimal Prometheus-style metrics and a sampling profiler
+
+Counters, gauges and histograms live in a module-level registry and render
+in the Prometheus text exposition format. Values are per process; under
+gunicorn each worker reports its own series.
+"""
+
+import sys
+import time
+import threading
+from bisect import bisect_left
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: Dict[str, "_Metric"] = {}
+_lock = threading.Lock()
+
+
+def _fmt_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help):
+        super().__init__(name, help)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [f"{self.name}{_fmt_labels(k)} {_num(v)}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help)
+        self._values: Dict[tuple, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def samples(self):
+        if self._fn is not None:
+            v = self._fn()
+            return [] if v is None else [f"{self.name} {_num(v)}"]
+        with self._lock:
+            return [f"{self.name}{_fmt_labels(k)} {_num(v)}" for k, v in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[i] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t, **labels)
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        for key, row in items:
+            acc = 0
+            for b, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                acc += n
+                le = 'le="%s"' % _num(b)
+                out.append(f"{self.name}_bucket{_fmt_labels(key, le)} {acc}")
+            out.append(f"{self.name}_count{_fmt_labels(key)} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(key)} {_num(row[-1])}")
+        return out
+
+
+def _register(cls, name, help, **kw):
+    """Create a metric, or return the one already registered under name"""
+    with _lock:
+        m = _registry.get(name)
+        if m is None:
+            m = _registry[name] = cls(name, help, **kw)
+        elif type(m) is not cls:
+            raise ValueError(f"metric {name} is already registered as a {m.kind}")
+        return m
+
+
+def counter(name: str, help: str) -> Counter:
+    return _register(Counter, name, help)
+
+
+def gauge(name: str, help: str, fn: Optional[Callable[[], float]] = None) -> Gauge:
+    return _register(Gauge, name, help, fn=fn)
+
+
+def histogram(name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, help, buckets=buckets)
+
+
+def render() -> str:
+    with _lock:
+        metrics = list(_registry.values())
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval into collapsed stacks"""
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id, self.interval = thread_id, interval
+        self.stacks = _Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> str:
+        """Stop sampling; returns flamegraph-compatible collapsed stacks"""
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{s} {n}" for s, n in self.stacks.most_common()) + "\n"
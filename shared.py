@@ -0,0 +1,199 @@
+"""
+Cross-process data layer for multi-worker deployments
+
+The fetching worker publishes the packed price matrix as a snapshot of .npy
+files and every worker memory-maps it, so all processes on a host share one
+copy through the page cache. Fetch progress goes to a small status file and a
+flock()ed lock file makes sure only one fetch runs per host.
+"""
+
+import os
+import json
+import shutil
+import logging
+import tempfile
+import threading
+from collections.abc import Mapping
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from analysis import Packed
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to a per-process lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_local_locks = {}
+
+
+def write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SnapshotCache(Mapping):
+    """Read-only ticker -> DataFrame view over a memory-mapped snapshot"""
+
+    def __init__(self, packed: Packed, generation: int, tag: str, modified: datetime):
+        self.packed, self.generation, self.tag, self.modified = packed, generation, tag, modified
+        self._index = {t: i for i, t in enumerate(packed.tickers)}
+
+    def __getitem__(self, ticker: str) -> pd.DataFrame:
+        c, d = self.packed.row(self._index[ticker])
+        return pd.DataFrame({'date': pd.to_datetime(d), 'close': np.array(c)})
+
+    def __iter__(self):
+        return iter(self.packed.tickers)
+
+    def __len__(self):
+        return len(self.packed.tickers)
+
+
+class SharedState:
+    """Snapshot, status and fetch lock files under one directory"""
+
+    def __init__(self, root: str, keep: int = 3):
+        self.root = root
+        self.keep = keep
+        self.snap_dir = os.path.join(root, 'snapshots')
+        self.current_path = os.path.join(root, 'CURRENT')
+        self.status_path = os.path.join(root, 'status.json')
+        self.lock_path = os.path.join(root, 'fetch.lock')
+        self._status = (None, None)
+
+    # Snapshots
+
+    def current(self) -> Optional[dict]:
+        try:
+            with open(self.current_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def current_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.current_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def publish(self, packed: Packed) -> SnapshotCache:
+        """Write packed as the next snapshot generation and point CURRENT at it"""
+        cur = self.current()
+        gen = (cur["generation"] if cur else 0) + 1
+        tag = f"{gen}-{os.urandom(4).hex()}"
+        path = os.path.join(self.snap_dir, tag)
+        os.makedirs(path)
+        np.save(os.path.join(path, 'closes.npy'), packed.closes)
+        np.save(os.path.join(path, 'dates.npy'), packed.dates)
+        np.save(os.path.join(path, 'lengths.npy'), packed.lengths)
+        with open(os.path.join(path, 'tickers.json'), 'w') as f:
+            json.dump(packed.tickers, f)
+        modified = datetime.now(timezone.utc)
+        meta = {"generation": gen, "tag": tag, "modified": modified.isoformat()}
+        write_atomic(self.current_path, json.dumps(meta).encode())
+        self._prune(tag)
+        return self.load(meta)
+
+    def load(self, meta: Optional[dict] = None) -> Optional[SnapshotCache]:
+        """Memory-map the snapshot named by meta (default CURRENT)"""
+        meta = meta or self.current()
+        if not meta:
+            return None
+        path = os.path.join(self.snap_dir, meta["tag"])
+        try:
+            with open(os.path.join(path, 'tickers.json')) as f:
+                tickers = json.load(f)
+            packed = Packed(tickers,
+                            np.load(os.path.join(path, 'closes.npy'), mmap_mode='r'),
+                            np.load(os.path.join(path, 'dates.npy'), mmap_mode='r'),
+                            np.load(os.path.join(path, 'lengths.npy'), mmap_mode='r'))
+        except (FileNotFoundError, ValueError) as e:
+            logger.warning(f"Snapshot {meta['tag']} unavailable: {e}")
+            return None
+        modified = datetime.fromisoformat(meta["modified"])
+        if modified.tzinfo is None:  # written in local time by older versions
+            modified = modified.astimezone(timezone.utc)
+        return SnapshotCache(packed, meta["generation"], meta["tag"], modified)
+
+    def _prune(self, latest: str):
+        # Mapped files stay valid for readers after unlink, so old
+        # generations can go as soon as CURRENT has moved on
+        old = sorted((d for d in os.listdir(self.snap_dir) if d != latest),
+                     key=lambda d: int(d.split('-')[0]))
+        for d in old[:max(0, len(old) - (self.keep - 1))]:
+            shutil.rmtree(os.path.join(self.snap_dir, d), ignore_errors=True)
+
+    # Status
+
+    def write_status(self, status: dict):
+        write_atomic(self.status_path, json.dumps(status).encode())
+
+    def read_status(self) -> Optional[dict]:
+        try:
+            mtime = os.stat(self.status_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if self._status[0] != mtime:
+            try:
+                with open(self.status_path) as f:
+                    self._status = (mtime, json.load(f))
+            except (FileNotFoundError, ValueError):
+                return self._status[1]
+        return self._status[1]
+
+    # Coordination
+
+    def fetch_lock(self) -> 'FetchLock':
+        return FetchLock(self.lock_path)
+
+
+class FetchLock:
+    """Host-wide exclusive lock; only the holder may run a fetch"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._tlock = _local_locks.setdefault(path, threading.Lock())
+
+    def acquire(self) -> bool:
+        if not self._tlock.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            self._tlock.release()
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._tlock.release()
+
+    def held(self) -> bool:
+        """True if any thread or process currently holds the lock"""
+        if not self.acquire():
+            return True
+        self.release()
+        return False
@@ -0,0 +1,97 @@
+"""
+Persistent columnar price store
+
+Each ticker is one .npy file holding a (date, close) record array sorted by
+date. Files are memory-mapped on read, so warming the cache or looking up the
+last stored bar touches only the pages that are needed.
+"""
+
+import os
+import logging
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BAR = np.dtype([('date', '<M8[D]'), ('close', '<f8')])
+
+
+class PriceStore:
+    """Date-keyed close history per ticker under a root directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker}.npy")
+
+    def tickers(self) -> List[str]:
+        try:
+            return sorted(f[:-4] for f in os.listdir(self.root) if f.endswith('.npy'))
+        except FileNotFoundError:
+            return []
+
+    def bars(self, ticker: str) -> Optional[np.ndarray]:
+        """Memory-mapped record array for ticker, or None if not stored"""
+        try:
+            return np.load(self.path(ticker), mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Unreadable store file for {ticker}: {e}")
+            return None
+
+    def last_date(self, ticker: str) -> Optional[pd.Timestamp]:
+        b = self.bars(ticker)
+        return pd.Timestamp(b['date'][-1]) if b is not None and len(b) else None
+
+    def load(self, ticker: str, tail: Optional[int] = None) -> Optional[pd.DataFrame]:
+        b = self.bars(ticker)
+        if b is None or not len(b):
+            return None
+        if tail:
+            b = b[-tail:]
+        return pd.DataFrame({'date': pd.to_datetime(b['date']), 'close': np.array(b['close'])})
+
+    def append(self, ticker: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Merge new bars into the stored history and return the full series.
+
+        Stored bars on or after the first new date are replaced, so a partial
+        bar from an earlier intraday refresh gets overwritten.
+        """
+        new = np.empty(len(df), dtype=BAR)
+        new['date'] = df['date'].values.astype('datetime64[D]')
+        new['close'] = df['close'].values
+        new = new[np.argsort(new['date'], kind='stable')]
+        old = self.bars(ticker)
+        if old is not None and len(old) and len(new):
+            merged = np.concatenate([old[old['date'] < new['date'][0]], new])
+        elif old is not None and len(old):
+            merged = np.array(old)
+        else:
+            merged = new
+        self._write(ticker, merged)
+        return pd.DataFrame({'date': pd.to_datetime(merged['date']), 'close': merged['close']})
+
+    def _write(self, ticker: str, bars: np.ndarray):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, bars)
+            os.replace(tmp, self.path(ticker))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def warm(self, tickers: Iterable[str], tail: int = 100, min_bars: int = 50) -> Dict[str, pd.DataFrame]:
+        """Build an analysis cache from stored history"""
+        cache = {}
+        for t in tickers:
+            df = self.load(t, tail=tail)
+            if df is not None and len(df) >= min_bars:
+                cache[t] = df
+        return cache
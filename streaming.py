@@ -0,0 +1,187 @@
+"""
+Streaming indicator state for live intraday updates
+
+IndicatorState holds the running sums behind analyze() for one ticker's
+window: shifted price sums for mean/std, the Wilder RSI smoothing split into
+its seed and exponential parts, and the AR(1) regression sums for the
+half-life. The window is the closed bars plus one live price, so an intraday
+tick only replaces the live price and a new bar rolls the window; both are
+O(1). LiveBook keeps one state per ticker and a lazily-invalidated heap of
+oversold names ranked by reversion probability.
+"""
+
+import heapq
+import math
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from analysis import prob_one, signal_one
+
+PERIOD = 14
+A = 1.0 / PERIOD
+
+
+class IndicatorState:
+    """O(1) mean/std, Wilder RSI and half-life over a sliding price window"""
+
+    __slots__ = ("w", "closed", "live", "k", "s1", "s2", "sx", "sy", "sxy", "sxx",
+                 "tg", "tl", "rolls", "_seed_w", "_drop_w")
+
+    def __init__(self, prices: Iterable[float]):
+        prices = np.asarray(prices, dtype=np.float64).tolist()
+        if len(prices) < 3:
+            raise ValueError("need at least 3 prices")
+        self.w = len(prices)
+        self.closed = deque(prices[:-1], maxlen=self.w - 1)
+        self.live = prices[-1]
+        n = self.w - 1  # diffs in the window
+        self._seed_w = (1 - A) ** (n - 1)
+        self._drop_w = A * (1 - A) ** (n - 3) if n >= 3 else 0.0
+        self.refresh()
+
+    def refresh(self):
+        """Recompute every sum from the stored window, clearing float drift"""
+        c = np.fromiter(self.closed, dtype=np.float64)
+        self.k = float(c[0])
+        cs = c - self.k
+        d = np.diff(c)
+        self.s1, self.s2 = float(cs.sum()), float(cs @ cs)
+        x = cs[:-1]
+        self.sx, self.sy, self.sxy, self.sxx = float(x.sum()), float(d.sum()), float(x @ d), float(x @ x)
+        # EMA of closed diffs 1.. with the weights that diff carries inside analyze()'s RSI
+        m = len(d) - 1
+        wts = A * (1 - A) ** np.arange(m - 1, -1, -1, dtype=np.float64)
+        self.tg = float(np.maximum(d[1:], 0) @ wts)
+        self.tl = float(np.maximum(-d[1:], 0) @ wts)
+        self.rolls = 0
+
+    def tick(self, price: float):
+        """Replace the live (still forming) bar's price"""
+        self.live = float(price)
+
+    def roll(self, price: float):
+        """Close the live bar and start a new one at price"""
+        c = self.closed
+        c0, c1, c2, last = c[0], c[1], c[2], c[-1]
+        d_live = self.live - last
+        d1 = c2 - c1
+        # Drop c0 and the pair (c0, c1 - c0); add live and the pair (last, d_live)
+        x0, xl, xn = c0 - self.k, last - self.k, self.live - self.k
+        self.s1 += xn - x0
+        self.s2 += xn * xn - x0 * x0
+        self.sx += xl - x0
+        self.sy += d_live - (c1 - c0)
+        self.sxy += xl * d_live - x0 * (c1 - c0)
+        self.sxx += xl * xl - x0 * x0
+        self.tg = (1 - A) * (self.tg - self._drop_w * max(d1, 0.0)) + A * max(d_live, 0.0)
+        self.tl = (1 - A) * (self.tl - self._drop_w * max(-d1, 0.0)) + A * max(-d_live, 0.0)
+        c.append(self.live)
+        self.live = float(price)
+        self.rolls += 1
+        if self.rolls >= self.w:
+            self.refresh()
+
+    def metrics(self) -> Optional[Dict[str, float]]:
+        """analyze() statistics for the current window, or None if flat"""
+        w, p = self.w, self.live
+        last = self.closed[-1]
+        xp = p - self.k
+        mean = (self.s1 + xp) / w
+        var = (self.s2 + xp * xp) / w - mean * mean
+        std = math.sqrt(var) if var > 0 else 0.0
+        if std < 0.01:
+            return None
+        mean += self.k
+        z = (p - mean) / std
+
+        d_live = p - last
+        first = self.closed[1] - self.closed[0]
+        ag = self._seed_w * max(first, 0.0) + (1 - A) * self.tg + A * max(d_live, 0.0)
+        al = self._seed_w * max(-first, 0.0) + (1 - A) * self.tl + A * max(-d_live, 0.0)
+        if w < PERIOD + 1:
+            r = 50.0
+        elif al < 0.0001:
+            r = 95.0 if ag > 0 else 50.0
+        else:
+            r = max(5, min(95, 100 - (100 / (1 + ag / al))))
+
+        n = w - 1
+        xl = last - self.k
+        sx, sy = self.sx + xl, self.sy + d_live
+        sxx, sxy = self.sxx + xl * xl, self.sxy + xl * d_live
+        den = sxx - sx * sx / n
+        if w < 20 or den <= 0:
+            hl = 30.0
+        else:
+            b = (sxy - sx * sy / n) / den
+            hl = 45.0 if b >= 0 else min(max(-math.log(2) / b, 3), 60)
+
+        return {
+            "price": p, "mean": mean, "std": std, "z": z, "rsi": r, "half_life": hl,
+            "prob": prob_one(z, r, hl), "days": min(max(hl * (1 + 0.5 * abs(z)), 3), 45),
+            "signal": signal_one(z, r)
+        }
+
+
+class LiveBook:
+    """Per-ticker streaming states plus a ranked oversold heap"""
+
+    def __init__(self, states: Dict[str, IndicatorState], z_max: float = -1.0):
+        self.states = states
+        self.z_max = z_max
+        self.latest: Dict[str, Dict[str, float]] = {}
+        self._version: Dict[str, int] = {}
+        self._heap: List[Tuple[float, str, int]] = []
+        for t in states:
+            self._update(t)
+
+    @classmethod
+    def from_packed(cls, packed, **kw) -> "LiveBook":
+        states = {}
+        for i, t in enumerate(packed.tickers):
+            p, _ = packed.row(i)
+            states[t] = IndicatorState(p)
+        return cls(states, **kw)
+
+    def _update(self, t: str):
+        m = self.states[t].metrics()
+        v = self._version.get(t, 0) + 1
+        self._version[t] = v
+        if m is None or round(m["z"], 2) > self.z_max:
+            self.latest.pop(t, None)
+            return
+        self.latest[t] = m
+        heapq.heappush(self._heap, (-round(m["prob"], 3), t, v))
+
+    def ingest(self, ticks: Mapping[str, float], new_bar: bool = False) -> List[str]:
+        """Apply a batch of prices; returns tickers that are not tracked"""
+        unknown = []
+        for t, price in ticks.items():
+            st = self.states.get(t)
+            if st is None:
+                unknown.append(t)
+                continue
+            if new_bar:
+                st.roll(price)
+            else:
+                st.tick(price)
+            self._update(t)
+        # Stale entries are skipped on read; compact once they dominate
+        if len(self._heap) > 4 * max(len(self.latest), 64):
+            self._heap = [(-round(m["prob"], 3), t, self._version[t]) for t, m in self.latest.items()]
+            heapq.heapify(self._heap)
+        return unknown
+
+    def top(self, n: int = 10) -> List[Tuple[str, Dict[str, float]]]:
+        """Best n oversold tickers by current reversion probability"""
+        out, popped = [], []
+        while self._heap and len(out) < n:
+            item = heapq.heappop(self._heap)
+            if self._version.get(item[1]) == item[2] and item[1] in self.latest:
+                out.append((item[1], self.latest[item[1]]))
+                popped.append(item)
+        for item in popped:
+            heapq.heappush(self._heap, item)
+        return out
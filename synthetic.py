@@ -0,0 +1,68 @@
+"""
+Deterministic synthetic price universes
+
+Each ticker's series depends only on (seed, index), so any shard of a
+universe can be regenerated independently in a worker process.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def tickers(n: int) -> List[str]:
+    return [f"S{i:05d}" for i in range(n)]
+
+
+def series(n_bars: int, indices, seed: int = 0, trend_share: float = 0.3) -> np.ndarray:
+    """Close matrix (len(indices), n_bars) of mean-reverting and trending series.
+
+    Mean-reverting rows follow an Ornstein-Uhlenbeck log price with a random
+    half-life of 3-60 bars; the rest are geometric random walks with drift.
+    """
+    indices = np.asarray(indices)
+    n = len(indices)
+    shocks = np.empty((n, n_bars))
+    params = np.empty((n, 5))
+    for k, i in enumerate(indices):
+        rng = np.random.default_rng([seed, int(i)])
+        params[k] = [rng.random(), rng.uniform(3, 60), rng.uniform(0.008, 0.03),
+                     rng.uniform(-0.0005, 0.001), np.log(rng.uniform(10, 500))]
+        shocks[k] = rng.standard_normal(n_bars)
+    trending = params[:, 0] < trend_share
+    theta = np.log(2) / params[:, 1]
+    sigma, drift, mu = params[:, 2], params[:, 3], params[:, 4]
+    x = np.empty((n, n_bars))
+    x[:, 0] = mu
+    for t in range(1, n_bars):
+        ou = x[:, t - 1] + theta * (mu - x[:, t - 1])
+        x[:, t] = np.where(trending, x[:, t - 1] + drift, ou) + sigma * shocks[:, t]
+    return np.exp(x)
+
+
+def walk(ticker: str, days: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Random-walk closes for ticker on business days (datetime64[D]).
+
+    The walk is indexed by business days since 2000-01-03, so a ticker's
+    price on a given day is the same whatever range is requested.
+    """
+    if not len(days):
+        return np.empty(0)
+    rng = np.random.default_rng([seed] + [ord(c) for c in ticker])
+    base = 20 + rng.random() * 300
+    pos = np.busday_count(np.datetime64('2000-01-03'), days)
+    return (base * np.exp(np.cumsum(rng.normal(0, 0.015, pos.max() + 1))))[pos]
+
+
+def universe(n: int, n_bars: int = 100, seed: int = 0, end=None,
+             trend_share: float = 0.3) -> Tuple[List[str], pd.DatetimeIndex, np.ndarray]:
+    """Tickers, business-day axis and close matrix for a whole universe"""
+    dates = pd.bdate_range(end=end or pd.Timestamp.today().normalize(), periods=n_bars)
+    return tickers(n), dates, series(n_bars, range(n), seed, trend_share)
+
+
+def cache(n: int, n_bars: int = 100, seed: int = 0, trend_share: float = 0.3) -> dict:
+    """Universe in the stock_data_cache shape (ticker -> date/close frame)"""
+    names, dates, closes = universe(n, n_bars, seed, trend_share=trend_share)
+    return {t: pd.DataFrame({'date': dates, 'close': closes[i]}) for i, t in enumerate(names)}
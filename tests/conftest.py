@@ -0,0 +1,42 @@
+"""Shared fixtures. The app is pointed at a throwaway store before anything imports it."""
+
+import os
+import sys
+import itertools
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="mrt-tests-")
+os.environ["PRICE_STORE"] = os.path.join(_tmp, "store")
+os.environ["SHARED_DIR"] = os.path.join(_tmp, "shared")
+
+import synthetic  # noqa: E402
+
+_generations = itertools.count(1)
+
+
+@pytest.fixture
+def mixed_cache():
+    """Synthetic universe with 50-100 bar histories and one flat series"""
+    cache = synthetic.cache(300, 100, seed=7)
+    for k, t in enumerate(list(cache)):
+        if k % 3 == 0:
+            cache[t] = cache[t].tail(50 + k % 50).reset_index(drop=True)
+    flat = cache["S00001"].copy()
+    flat["close"] = 42.0
+    cache["FLAT"] = flat
+    return cache
+
+
+@pytest.fixture
+def client(mixed_cache):
+    """Test client serving mixed_cache as a fresh cache generation"""
+    import app
+    gen = next(_generations)
+    app.adopt(mixed_cache, gen, f"test-{gen}", datetime(2026, 1, 2, 12, 0, tzinfo=timezone.utc))
+    return app.app.test_client()
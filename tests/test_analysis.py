@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import analysis
+import app
+
+
+def legacy_rows(cache, z_max=-1.0):
+    """Ranking as the original /api/analyze built it, one analyze() call per ticker"""
+    rows = []
+    for t, df in cache.items():
+        a = app.analyze(t, df, series=False)
+        if a and a.z <= z_max:
+            rows.append(app.result_row(a, series=False))
+    rows.sort(key=lambda r: r["reversion_probability"], reverse=True)
+    return rows
+
+
+def test_scan_matches_scalar_functions(mixed_cache):
+    packed = analysis.pack(mixed_cache)
+    s = analysis.scan(packed)
+    assert set(packed.lengths) >= {50, 99, 100}
+    for i, t in enumerate(packed.tickers):
+        p = mixed_cache[t]["close"].values
+        assert packed.lengths[i] == len(p)
+        np.testing.assert_array_equal(packed.row(i)[0], p)
+        m, sd = np.mean(p), np.std(p)
+        assert s.mean[i] == pytest.approx(m, rel=1e-12)
+        assert s.std[i] == pytest.approx(sd, rel=1e-9)
+        if sd < 0.01:
+            assert not s.valid[i]
+            continue
+        z = (p[-1] - m) / sd
+        r, hl = app.rsi(p), app.half_life(p)
+        assert s.z[i] == pytest.approx(z, abs=1e-9)
+        assert s.rsi[i] == pytest.approx(r, abs=1e-9)
+        assert s.half_life[i] == pytest.approx(hl, abs=1e-9)
+        assert s.prob[i] == pytest.approx(app.prob(z, r, hl), abs=1e-9)
+        assert s.days[i] == pytest.approx(min(max(hl * (1 + 0.5 * abs(z)), 3), 45), abs=1e-9)
+
+
+def test_flat_series_is_skipped(mixed_cache):
+    packed = analysis.pack(mixed_cache)
+    s = analysis.scan(packed)
+    i = packed.tickers.index("FLAT")
+    assert not s.valid[i]
+    assert i not in analysis.rank(s, z_max=0.0)
+    assert app.analyze("FLAT", mixed_cache["FLAT"]) is None
+
+
+def test_rank_matches_analyze(mixed_cache):
+    packed = analysis.pack(mixed_cache)
+    s = analysis.scan(packed)
+    for z_max in (-1.0, 0.0):
+        got = [app.result_row(app.stock_from_scan(packed, s, i, series=False), series=False)
+               for i in analysis.rank(s, z_max=z_max)]
+        assert got == legacy_rows(mixed_cache, z_max)
+
+
+def test_rank_ties_keep_cache_order(mixed_cache):
+    oversold = legacy_rows(mixed_cache)[0]["ticker"]
+    cache = {"TIE_B": mixed_cache[oversold], **mixed_cache, "TIE_A": mixed_cache[oversold].copy()}
+    packed = analysis.pack(cache)
+    s = analysis.scan(packed)
+    order = [packed.tickers[i] for i in analysis.rank(s)]
+    assert order.index("TIE_B") < order.index(oversold) < order.index("TIE_A")
+    assert order == [r["ticker"] for r in legacy_rows(cache)]
+
+
+def test_stock_from_scan_series_matches_analyze(mixed_cache):
+    packed = analysis.pack(mixed_cache)
+    s = analysis.scan(packed)
+    for i in analysis.rank(s)[:5]:
+        t = packed.tickers[i]
+        assert app.stock_from_scan(packed, s, i) == app.analyze(t, mixed_cache[t])
+
+
+def test_scalar_and_batch_models_agree():
+    z = np.array([-3.0, -2.0, -1.8, -1.5, -1.0, -0.5, 0.0, 0.7])
+    r = np.array([10.0, 29.999, 30.0, 35.0, 40.0, 44.9, 45.0, 90.0])
+    hl = np.array([3.0, 29.9, 30.0, 45.0, 60.0, 75.0])
+    zz, rr, hh = (a.ravel() for a in np.meshgrid(z, r, hl, indexing="ij"))
+    batch, labels = analysis.prob_batch(zz, rr, hh), analysis.signal_batch(zz, rr)
+    for k in range(len(zz)):
+        assert app.prob(zz[k], rr[k], hh[k]) == pytest.approx(batch[k], abs=1e-12)
+        assert analysis.signal_one(zz[k], rr[k]) == labels[k]
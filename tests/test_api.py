@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import app
+import metrics
+
+
+def test_analyze_etag_and_304(client):
+    r = client.get("/api/analyze")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert r.headers["Last-Modified"]
+    assert "no-cache" in r.headers["Cache-Control"]
+    again = client.get("/api/analyze", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert client.get("/api/analyze", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_etag_changes_with_generation(client, mixed_cache):
+    etag = client.get("/api/analyze").headers["ETag"]
+    app.adopt(mixed_cache, 10_000, "test-next", datetime(2026, 1, 3, tzinfo=timezone.utc))
+    r = client.get("/api/analyze", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+
+def test_default_lists_top_oversold(client):
+    d = client.get("/api/analyze").get_json()
+    res = d["results"]
+    assert 0 < len(res) <= 10
+    assert d["total_analyzed"] == len(app.stock_data_cache)
+    assert all(r["z_score"] <= -1.0 for r in res)
+    probs = [r["reversion_probability"] for r in res]
+    assert probs == sorted(probs, reverse=True)
+    assert {"prices", "dates", "gap_history"} <= set(res[0])
+
+
+def test_filters(client):
+    rows = app.analysis_memo().rows
+    d = client.get("/api/analyze?top=3&max_corr=1").get_json()
+    assert len(d["results"]) == 3
+    assert d["candidates_found"] == sum(r["z_score"] <= -1.0 for r in rows)
+
+    d = client.get("/api/analyze?z_max=-2&top=500&max_corr=1").get_json()
+    assert d["results"] and all(r["z_score"] <= -2 for r in d["results"])
+    assert len(d["results"]) == d["candidates_found"] == sum(r["z_score"] <= -2 for r in rows)
+
+    d = client.get("/api/analyze?min_prob=0.7&z_max=0&top=500&max_corr=1").get_json()
+    assert all(r["reversion_probability"] >= 0.7 for r in d["results"])
+    assert len(d["results"]) == sum(r["reversion_probability"] >= 0.7 for r in rows)
+
+    d = client.get("/api/analyze?signal=strong%20buy,BUY&top=500&max_corr=1").get_json()
+    assert {r["signal_strength"] for r in d["results"]} <= {"STRONG BUY", "BUY"}
+    assert len(d["results"]) == sum(r["signal_strength"] in ("STRONG BUY", "BUY") and r["z_score"] <= -1.0
+                                    for r in rows)
+
+
+def test_filtered_responses_share_the_etag(client):
+    etag = client.get("/api/analyze").headers["ETag"]
+    r = client.get("/api/analyze?top=3", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+
+def test_filtered_304_skips_the_work(client, monkeypatch):
+    etag = client.get("/api/analyze").headers["ETag"]
+
+    def fail(*a, **kw):
+        raise AssertionError("built a body for a 304")
+
+    monkeypatch.setattr(app.AnalysisMemo, "pick", fail)
+    monkeypatch.setattr(app.formats, "dumps_json", fail)
+    r = client.get("/api/analyze?top=50&min_prob=0.5", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+
+
+def test_last_modified_is_utc(client, mixed_cache, monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        app.set_cache(mixed_cache)
+        r = client.get("/api/analyze")
+        lm = parsedate_to_datetime(r.headers["Last-Modified"])
+        assert abs((datetime.now(timezone.utc) - lm).total_seconds()) < 60
+        assert app.shared_state.load().modified.utcoffset().total_seconds() == 0
+        age = [l for l in metrics.render().splitlines() if l.startswith("cache_age_seconds ")]
+        assert 0 <= float(age[0].split()[1]) < 60
+    finally:
+        monkeypatch.undo()
+        time.tzset()
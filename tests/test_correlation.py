@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+from itertools import combinations
+
+import numpy as np
+
+import analysis
+import app
+import synthetic
+from correlation import Correlation
+
+
+def shifted_pair():
+    """Packs one bar apart, the later one with its rows in a different order"""
+    cache = synthetic.cache(60, 101, seed=3)
+    prev = analysis.pack({t: df.head(100) for t, df in cache.items()})
+    order = list(cache)[::-1]
+    cur = analysis.pack({t: cache[t].tail(100).reset_index(drop=True) for t in order})
+    return prev, cur
+
+
+def test_advance_matches_build():
+    prev, cur = shifted_pair()
+    got = Correlation.build(prev).advance(cur)
+    want = Correlation.build(cur)
+    assert got is not None
+    assert got.tickers == want.tickers
+    np.testing.assert_array_equal(got.x, want.x)
+    np.testing.assert_array_equal(got.zs, want.zs)
+
+
+def test_advance_refuses_revised_overlap_close():
+    prev, cur = shifted_pair()
+    closes = cur.closes.copy()
+    closes[5, -2] *= 1.01  # the bar both packs share was re-fetched with a new close
+    revised = analysis.Packed(cur.tickers, closes, cur.dates, cur.lengths)
+    assert Correlation.build(prev).advance(revised) is None
+
+
+def test_advance_refuses_other_tickers():
+    prev, cur = shifted_pair()
+    renamed = analysis.Packed(["NEW"] + cur.tickers[1:], cur.closes, cur.dates, cur.lengths)
+    assert Correlation.build(prev).advance(renamed) is None
+
+
+def clone(df, seed, scale=1.5):
+    """df scaled with a little noise: the same stock under a second listing"""
+    out = df.copy()
+    noise = np.random.default_rng(seed).normal(0, 0.0005, len(df))
+    out["close"] = df["close"].values * scale * np.exp(noise)
+    return out
+
+
+def test_distinct_drops_a_cloned_listing():
+    cache = synthetic.cache(50, 100, seed=4)
+    cache["GOOGL"] = clone(cache["S00010"], 1)
+    corr = Correlation.build(analysis.pack(cache))
+    goog, googl = corr.index["S00010"], corr.index["GOOGL"]
+    assert corr.rows_corr(np.array([goog]))[0, googl] > 0.99
+    order = [goog, googl] + [i for i in range(len(corr.tickers)) if i not in (goog, googl)]
+    kept = corr.distinct(order, 10, 0.9)
+    assert kept[0] == goog and googl not in kept and len(kept) == 10
+    assert corr.distinct(order, 10, 1.0)[:2] == [goog, googl]
+
+
+def test_default_top_has_no_correlated_pair(mixed_cache):
+    cache = dict(mixed_cache)
+    packed = analysis.pack(mixed_cache)
+    leaders = [packed.tickers[i] for i in analysis.rank(analysis.scan(packed))[:5]]
+    for k, t in enumerate(leaders):
+        cache[f"{t}_B"] = clone(mixed_cache[t], k, scale=1.0)
+    app.adopt(cache, 50_000, "test-dedupe", datetime(2026, 1, 5, tzinfo=timezone.utc))
+    client = app.app.test_client()
+    corr = Correlation.build(analysis.pack(cache))
+
+    def max_pair(results):
+        rows = np.array([corr.index[r["ticker"]] for r in results])
+        c = corr.rows_corr(rows)[:, rows]
+        return max(c[i, j] for i, j in combinations(range(len(rows)), 2))
+
+    undeduped = client.get("/api/analyze?max_corr=1").get_json()["results"]
+    assert max_pair(undeduped) > app.DEDUPE_CORR
+    res = client.get("/api/analyze").get_json()["results"]
+    assert len(res) == 10
+    assert max_pair(res) <= app.DEDUPE_CORR + 1e-6
+    assert not {r["ticker"] for r in res} >= {leaders[0], f"{leaders[0]}_B"}
@@ -0,0 +1,107 @@
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from bench import fake_yfinance
+from fetcher import FakeProvider, YahooProvider, fetch_universe
+
+
+class Recorder(FakeProvider):
+    """FakeProvider that records each request and can fail the first few"""
+
+    def __init__(self, fail_first=0, **kw):
+        super().__init__(latency=0, jitter=0, **kw)
+        self.requests = []
+        self.fail_first = fail_first
+        self._req_lock = threading.Lock()
+
+    def history(self, tickers, start, end):
+        with self._req_lock:
+            self.requests.append((tuple(tickers), start))
+            fail = len(self.requests) <= self.fail_first
+        if fail:
+            raise ConnectionError("boom")
+        return super().history(tickers, start, end)
+
+
+def collect(tickers, provider, **kw):
+    seen = []
+    got = fetch_universe(tickers, provider, on_result=lambda t, df, reason: seen.append((t, df, reason)),
+                         backoff=0, **kw)
+    return got, seen
+
+
+def test_groups_by_start_date():
+    provider = Recorder()
+    since = {"A": datetime(2026, 3, 2), "B": datetime(2026, 3, 2), "C": datetime(2026, 3, 9)}
+    got, _ = collect(["A", "B", "C", "D", "E"], provider, since=since, batch_size=2, workers=1)
+    starts = {}
+    for batch, start in provider.requests:
+        starts.setdefault(start, []).extend(batch)
+    assert starts["2026-03-02"] == ["A", "B"]
+    assert starts["2026-03-09"] == ["C"]
+    default = [s for s in starts if s not in ("2026-03-02", "2026-03-09")]
+    assert len(default) == 1 and sorted(starts[default[0]]) == ["D", "E"]
+    assert all(len(b) <= 2 for b, _ in provider.requests)
+    assert got["A"]["date"].iloc[0] == pd.Timestamp("2026-03-02")
+
+
+def test_one_result_per_ticker():
+    tickers = [f"T{i:03d}" for i in range(120)]
+    provider = Recorder(fail_rate=0.2, batch_fail_rate=0.1)
+    got, seen = collect(tickers, provider, batch_size=7, workers=4, retries=0)
+    counts = Counter(t for t, _, _ in seen)
+    assert set(counts) == set(tickers) and set(counts.values()) == {1}
+    assert {t for t, df, _ in seen if df is not None} == set(got)
+    assert {reason for _, df, reason in seen if df is None} <= {"empty", "ConnectionError"}
+    assert all(reason is None for _, df, reason in seen if df is not None)
+    assert len(got) < len(tickers)
+
+
+def test_retries_provider_errors():
+    provider = Recorder(fail_first=1)
+    got, seen = collect(["A", "B"], provider, batch_size=2, workers=1, retries=1)
+    assert len(provider.requests) == 2
+    assert set(got) == {"A", "B"}
+
+    provider = Recorder(fail_first=2)
+    got, seen = collect(["A", "B"], provider, batch_size=2, workers=1, retries=1)
+    assert got == {} and [(df, reason) for _, df, reason in seen] == [(None, "ConnectionError")] * 2
+
+
+def test_yahoo_provider_requests_each_ticker(monkeypatch):
+    monkeypatch.setitem(sys.modules, "yfinance", fake_yfinance)
+    monkeypatch.setattr(fake_yfinance, "config", dict(fake_yfinance.config, latency=0, error_rate=0))
+    fake_yfinance.calls.update(history=0)
+    tickers = [f"T{i:02d}" for i in range(10)]
+    got = fetch_universe(tickers, YahooProvider(), batch_size=50, workers=4)
+    assert set(got) == set(tickers)
+    assert fake_yfinance.calls["history"] == len(tickers)
+
+
+def test_yahoo_provider_errors_reach_retry(monkeypatch):
+    monkeypatch.setitem(sys.modules, "yfinance", fake_yfinance)
+    monkeypatch.setattr(fake_yfinance, "config", dict(fake_yfinance.config, latency=0, error_rate=1.0))
+    with pytest.raises(ConnectionError):
+        YahooProvider().history(["A"], "2026-01-02", "2026-02-02")
+
+
+def test_failures_counted_once_per_unloaded_ticker():
+    import app
+    import fetcher
+
+    def total():
+        return sum(fetcher.FAILURES._values.values())
+
+    before, failed = total(), 0
+    for seed in (1, 2):
+        app.fetch_all(FakeProvider(latency=0, jitter=0, fail_rate=0.05, seed=seed))
+        failed += app.fetch_status["failed"]
+        assert app.fetch_status["completed"] + app.fetch_status["failed"] == len(app.SP500)
+    # The second fetch falls back to the store for most of its misses
+    assert 0 < failed < 0.05 * len(app.SP500) * 2
+    assert total() - before == failed
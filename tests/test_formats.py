@@ -0,0 +1,89 @@
+import gzip
+
+import numpy as np
+import pytest
+
+import formats
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_series_share_a_date_axis(client, mixed_cache):
+    short, full = "S00000", "S00001"
+    assert len(mixed_cache[short]) == 50 and len(mixed_cache[full]) == 100
+    d = client.get(f"/api/series?tickers={short},{full},NOPE").get_json()
+    assert d["dates"] == mixed_cache[full]["date"].dt.strftime("%Y-%m-%d").tolist()
+    assert set(d["series"]) == {short, full}
+    s = d["series"][short]
+    assert s["prices"][:50] == [None] * 50 and s["gap_history"][:50] == [None] * 50
+    assert s["prices"][50:] == [round(x, 2) for x in mixed_cache[short]["close"]]
+    mean = mixed_cache[short]["close"].mean()
+    assert s["gap_history"][50:] == pytest.approx([x - mean for x in mixed_cache[short]["close"]], abs=0.006)
+    assert None not in d["series"][full]["prices"]
+
+    m = client.get(f"/api/series?tickers={short},{full}&format=msgpack")
+    assert m.mimetype == formats.MSGPACK
+    u = msgpack.unpackb(m.data)
+    assert u["dates"] == d["dates"]
+    assert np.isnan(u["series"][short]["prices"][:50]).all()
+
+
+def test_format_negotiation(client):
+    plain = client.get("/api/analyze").get_json()
+    compact = client.get("/api/analyze?format=compact")
+    assert compact.mimetype == formats.JSON
+    cols = compact.get_json()["columns"]
+    assert cols["ticker"] == [r["ticker"] for r in plain["results"]]
+    assert cols["peer_z"] == [r["peer_z"] for r in plain["results"]]
+
+    for r in (client.get("/api/analyze?format=msgpack"),
+              client.get("/api/analyze", headers={"Accept": formats.MSGPACK})):
+        assert r.mimetype == formats.MSGPACK
+        u = msgpack.unpackb(r.data)
+        assert u["columns"]["ticker"] == cols["ticker"]
+        assert u["columns"]["z_score"] == pytest.approx(cols["z_score"], rel=1e-6)
+
+    r = client.get("/api/analyze", headers={"Accept": f"{formats.MSGPACK};q=0.5, application/json"})
+    assert r.mimetype == formats.JSON and "results" in r.get_json()
+
+
+def test_unavailable_format_is_406(client, monkeypatch):
+    monkeypatch.setattr(formats, "pa", None)
+    assert client.get("/api/analyze?format=arrow").status_code == 406
+    assert client.get("/api/analyze?format=xml").status_code == 406
+    assert client.get("/api/series?tickers=S00001&format=compact").status_code == 406
+    # An Accept header only states preferences, so it falls back to JSON
+    r = client.get("/api/analyze", headers={"Accept": formats.ARROW})
+    assert r.status_code == 200 and r.mimetype == formats.JSON
+
+    monkeypatch.setattr(formats, "msgpack", None)
+    assert client.get("/api/analyze?format=msgpack").status_code == 406
+    assert client.get("/api/analyze", headers={"Accept": formats.MSGPACK}).mimetype == formats.JSON
+
+
+def test_each_variant_has_its_own_etag(client):
+    gz = {"Accept-Encoding": "gzip"}
+    variants = {
+        "json": ("/api/analyze", {}),
+        "json-gz": ("/api/analyze", gz),
+        "compact": ("/api/analyze?format=compact", {}),
+        "compact-gz": ("/api/analyze?format=compact", gz),
+        "msgpack": ("/api/analyze?format=msgpack", {}),
+        "msgpack-gz": ("/api/analyze?format=msgpack", gz),
+    }
+    tags = {}
+    for name, (url, headers) in variants.items():
+        r = client.get(url, headers=headers)
+        assert r.status_code == 200
+        assert set(r.vary) >= {"Accept", "Accept-Encoding"}
+        if "gz" in name:
+            assert r.headers["Content-Encoding"] == "gzip"
+            body = gzip.decompress(r.data)
+            assert body == client.get(url).data
+        tags[name] = r.headers["ETag"]
+    assert len(set(tags.values())) == len(tags)
+
+    for name, (url, headers) in variants.items():
+        assert client.get(url, headers={**headers, "If-None-Match": tags[name]}).status_code == 304
+        other = tags["msgpack" if name != "msgpack" else "json"]
+        assert client.get(url, headers={**headers, "If-None-Match": other}).status_code == 200
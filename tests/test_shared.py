@@ -0,0 +1,118 @@
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+import analysis
+import app
+import synthetic
+from shared import FetchLock, SharedState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Holds the lock at argv[1] in a separate process until stdin closes
+HOLD = """
+import sys
+from shared import FetchLock
+lock = FetchLock(sys.argv[1])
+print(lock.acquire(), flush=True)
+sys.stdin.readline()
+"""
+
+
+class Holder:
+    """Another process trying to take a FetchLock"""
+
+    def __init__(self, path):
+        self.proc = subprocess.Popen([sys.executable, "-c", HOLD, path], cwd=ROOT, text=True,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.acquired = self.proc.stdout.readline().strip() == "True"
+
+    def stop(self):
+        self.proc.communicate("\n", timeout=30)
+
+
+def test_publish_and_load_round_trip(tmp_path, mixed_cache):
+    state = SharedState(str(tmp_path), keep=3)
+    packed = analysis.pack(mixed_cache)
+    snap = state.publish(packed)
+    assert snap.generation == 1 and state.current()["tag"] == snap.tag
+    loaded = state.load()
+    assert loaded.tag == snap.tag and loaded.modified == snap.modified
+    assert loaded.packed.tickers == packed.tickers
+    np.testing.assert_array_equal(loaded.packed.closes, packed.closes)
+    np.testing.assert_array_equal(loaded.packed.dates, packed.dates)
+    np.testing.assert_array_equal(loaded.packed.lengths, packed.lengths)
+    assert isinstance(loaded.packed.closes, np.memmap)
+    t = packed.tickers[3]
+    np.testing.assert_array_equal(loaded[t]["close"].values, mixed_cache[t]["close"].values)
+
+
+def test_prune_keeps_the_newest(tmp_path, mixed_cache):
+    state = SharedState(str(tmp_path), keep=3)
+    packed = analysis.pack(mixed_cache)
+    tags = [state.publish(packed).tag for _ in range(5)]
+    assert sorted(os.listdir(state.snap_dir)) == sorted(tags[-3:])
+    assert state.current()["generation"] == 5
+    assert state.load({"generation": 1, "tag": tags[0], "modified": "2026-01-01T00:00:00+00:00"}) is None
+
+
+def test_fetch_lock_in_process(tmp_path):
+    path = str(tmp_path / "fetch.lock")
+    first, second = FetchLock(path), FetchLock(path)
+    assert first.acquire()
+    assert not second.acquire()
+    assert second.held()
+    first.release()
+    assert not second.held()
+    assert second.acquire()
+    second.release()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="cross-process locking needs flock()")
+def test_fetch_lock_across_processes(tmp_path):
+    path = str(tmp_path / "fetch.lock")
+    lock = FetchLock(path)
+    assert lock.acquire()
+    child = Holder(path)
+    child.stop()
+    assert not child.acquired
+    lock.release()
+
+    child = Holder(path)
+    try:
+        assert child.acquired
+        assert lock.held()
+        assert not lock.acquire()
+    finally:
+        child.stop()
+    assert not lock.held()
+
+
+def test_sync_cache_follows_another_worker():
+    other = SharedState(app.SHARED_DIR)  # the worker that ran the fetch
+    cache = synthetic.cache(40, 80, seed=11)
+    snap = other.publish(analysis.pack(cache))
+    assert app.cache_tag != snap.tag
+    app.sync_cache()
+    assert app.cache_tag == snap.tag and app.cache_generation == snap.generation
+    assert list(app.stock_data_cache) == list(cache)
+    assert app.analysis_memo().tag == snap.tag
+
+
+@pytest.mark.skipif(os.name != "posix", reason="cross-process locking needs flock()")
+def test_stale_in_progress_clears_when_lock_is_free(monkeypatch):
+    monkeypatch.setattr(app, "fetch_status", dict(app.fetch_status, in_progress=False))
+    status = dict(app.fetch_status, in_progress=True, message="Fetched A... (1/500)")
+    app.shared_state.write_status(status)
+    child = Holder(app.shared_state.lock_path)  # the fetching worker
+    try:
+        assert child.acquired
+        assert app.current_status()["in_progress"]
+    finally:
+        child.stop()
+    # The fetcher died without publishing a final status
+    st = app.current_status()
+    assert not st["in_progress"] and st["message"] == status["message"]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from store import PriceStore
+
+
+def frame(start, closes):
+    return pd.DataFrame({"date": pd.bdate_range(start, periods=len(closes)), "close": closes})
+
+
+def test_append_to_empty_store_roundtrips(tmp_path):
+    store = PriceStore(str(tmp_path / "prices"))
+    assert store.tickers() == []
+    full = store.append("AAA", frame("2024-01-01", [1.0, 2.0, 3.0]))
+    assert list(full["close"]) == [1.0, 2.0, 3.0]
+    assert store.tickers() == ["AAA"]
+    assert store.last_date("AAA") == pd.Timestamp("2024-01-03")
+    loaded = store.load("AAA")
+    pd.testing.assert_frame_equal(loaded, full)
+
+
+def test_append_overwrites_from_first_new_date(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append("AAA", frame("2024-01-01", [1.0, 2.0, 3.0, 4.0]))
+    # Re-fetch starting at the stored 2024-01-03 bar, e.g. after an intraday capture
+    full = store.append("AAA", frame("2024-01-03", [30.0, 40.0, 50.0]))
+    assert list(full["close"]) == [1.0, 2.0, 30.0, 40.0, 50.0]
+    assert list(full["date"]) == list(pd.bdate_range("2024-01-01", periods=5))
+    assert list(store.load("AAA")["close"]) == [1.0, 2.0, 30.0, 40.0, 50.0]
+
+
+def test_append_sorts_new_bars(tmp_path):
+    store = PriceStore(str(tmp_path))
+    df = frame("2024-01-01", [1.0, 2.0, 3.0]).iloc[::-1]
+    full = store.append("AAA", df)
+    assert list(full["close"]) == [1.0, 2.0, 3.0]
+    assert full["date"].is_monotonic_increasing
+
+
+def test_append_empty_keeps_history(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append("AAA", frame("2024-01-01", [1.0, 2.0]))
+    full = store.append("AAA", frame("2024-02-01", []))
+    assert list(full["close"]) == [1.0, 2.0]
+
+
+def test_warm_applies_tail_and_min_bars(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.append("LONG", frame("2023-01-02", np.arange(1.0, 151.0)))
+    store.append("SHORT", frame("2024-01-01", np.arange(1.0, 31.0)))
+    cache = store.warm(["LONG", "SHORT", "MISSING"], tail=100, min_bars=50)
+    assert list(cache) == ["LONG"]
+    assert len(cache["LONG"]) == 100
+    assert cache["LONG"]["close"].iloc[-1] == 150.0
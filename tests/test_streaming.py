@@ -0,0 +1,110 @@
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from fetcher import FakeProvider
+from streaming import IndicatorState, LiveBook
+
+
+def reference(window):
+    p = np.asarray(window)
+    m, sd = p.mean(), p.std()
+    z = (p[-1] - m) / sd
+    r, hl = app.rsi(p), app.half_life(p)
+    return {"mean": m, "std": sd, "z": z, "rsi": r, "half_life": hl, "prob": app.prob(z, r, hl),
+            "days": min(max(hl * (1 + 0.5 * abs(z)), 3), 45)}
+
+
+def check(state):
+    window = list(state.closed) + [state.live]
+    got, want = state.metrics(), reference(window)
+    for k, v in want.items():
+        assert got[k] == pytest.approx(v, rel=1e-9, abs=1e-9), k
+    a = app.analyze("X", pd.DataFrame({"close": window}), series=False)
+    if a is not None:
+        assert got["signal"] == a.signal
+
+
+@pytest.mark.parametrize("w", [20, 60, 100])
+def test_metrics_match_analyze_across_ticks_and_rolls(w):
+    rng = np.random.default_rng(w)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, w + 400)))
+    state = IndicatorState(prices[:w])
+    check(state)
+    k = w
+    # Mixed intraday ticks and bar rolls, running well past several refresh() points
+    while k < len(prices):
+        if rng.random() < 0.4:
+            state.tick(prices[k] * (1 + rng.normal(0, 0.01)))
+        else:
+            state.roll(prices[k])
+            k += 1
+        check(state)
+    assert state.rolls < w
+
+
+def test_refresh_boundary():
+    rng = np.random.default_rng(3)
+    prices = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, 300)))
+    state = IndicatorState(prices[:100])
+    for k in range(100, 300):
+        state.roll(prices[k])
+        if state.rolls in (0, 1, state.w - 1):
+            check(state)
+
+
+def test_live_book_ranks_by_probability(mixed_cache):
+    import analysis
+    book = LiveBook.from_packed(analysis.pack(mixed_cache))
+    top = book.top(10)
+    probs = [round(m["prob"], 3) for _, m in top]
+    assert probs == sorted(probs, reverse=True)
+    assert all(round(m["z"], 2) <= -1.0 for _, m in top)
+
+
+@pytest.mark.parametrize("price", ["nan", "inf", "-inf", -5, 0])
+def test_ticks_reject_bad_prices(client, price):
+    r = client.post("/api/ticks", json={"ticks": {"S00002": 10.0, "S00003": price}, "new_bar": True})
+    assert r.status_code == 400
+    assert r.get_json()["invalid"] == ["S00003"]
+
+
+def test_ticks_update_live_book(client):
+    r = client.post("/api/ticks", json={"ticks": {"S00002": 1.0, "NOPE": 5}, "new_bar": False})
+    assert r.get_json() == {"updated": 1, "unknown": ["NOPE"]}
+    live = client.get("/api/live?top=500").get_json()
+    assert "S00002" in [x["ticker"] for x in live["results"]]
+
+
+def read_events(resp):
+    events = []
+    for chunk in resp.response:
+        for block in (chunk.decode() if isinstance(chunk, bytes) else chunk).split("\n\n"):
+            if block.startswith("event: "):
+                head, data = block.split("\n", 1)
+                events.append((head[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_event_order():
+    app.reset_status()
+    fetch = threading.Thread(target=app.fetch_all, args=(FakeProvider(latency=0.2, jitter=0),))
+    fetch.start()
+    try:
+        events = read_events(app.app.test_client().get("/api/stream", buffered=False))
+    finally:
+        fetch.join()
+    kinds = [k for k, _ in events]
+    assert kinds[0] == "progress" and kinds[-1] == "done" and kinds.count("done") == 1
+    partials = [d for k, d in events if k == "partial"]
+    assert partials and all(d["results"] for d in partials)
+    for d in partials:
+        probs = [r["reversion_probability"] for r in d["results"]]
+        assert probs == sorted(probs, reverse=True) and len(probs) <= app.PARTIAL_TOP
+    done = [d["completed"] + d["failed"] for k, d in events if k == "progress"]
+    assert done == sorted(done)
+    assert events[-1][1]["completed"] == len(app.SP500)